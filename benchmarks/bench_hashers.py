@@ -0,0 +1,46 @@
+"""
+Compares the speed of the spec hashers on the kind of options a typical spec
+has. Run it from the root of the repository::
+
+    python benchmarks/bench_hashers.py [iterations]
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_imagekit import hashers
+from flask_imagekit.exceptions import ImproperlyConfigured
+from flask_imagekit.processors import Adjust, ResizeToFill, Transpose
+
+
+SPEC_OPTIONS = [
+    u'photos/2016/05/some-uploaded-photo.jpg',
+    [Transpose(), Adjust(contrast=1.2, sharpness=1.1), ResizeToFill(300, 200)],
+    'JPEG',
+    {'quality': 85, 'progressive': True},
+    True,
+]
+
+
+def main(iterations=20000):
+    baseline = None
+    for name in ('pickle', 'md5', 'blake2b', 'xxhash', 'xxh3'):
+        hasher = getattr(hashers, name)
+        try:
+            hasher(SPEC_OPTIONS)
+        except ImproperlyConfigured as e:
+            print('%-8s  skipped (%s)' % (name, e))
+            continue
+        seconds = min(timeit.repeat(lambda: hasher(SPEC_OPTIONS),
+                                    number=iterations, repeat=3))
+        per_call = seconds / iterations * 1e6
+        baseline = baseline or per_call
+        print('%-8s %8.2f us/hash  %5.1fx' % (name, per_call,
+                                              baseline / per_call))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -9,3 +9,7 @@ def initialize_imagekit(app, **kwargs):
 
     from .template import generateimage
     app.add_template_global(generateimage)
+
+    if hasattr(app, 'cli'):
+        from .commands import generateimages
+        app.cli.add_command(generateimages)
@@ -1,8 +1,12 @@
 from copy import copy
 from ..files import BaseIKFile
+from ..registry import generator_registry
+from .backends import CacheFileState
 from ..signals import content_required, existence_required
-from ..utils import get_singleton, generate, get_by_qname, get_flask_app, conf
-from ..django_ported.files import File, ImageFile
+from ..utils import (get_singleton, generate, get_by_qname, get_flask_app,
+                     run_in_executor, resolved, conf)
+from ..django_ported.files import (ImageFile, get_image_dimensions,
+                                   get_stored_image_dimensions)
 
 
 class ImageCacheFile(BaseIKFile, ImageFile):
@@ -54,7 +58,7 @@ class ImageCacheFile(BaseIKFile, ImageFile):
 
     def _require_file(self):
         if getattr(self, '_file', None) is None:
-            content_required.send(self, file=self)
+            generator_registry.send(content_required, self)
             self._file = self.storage.open(self.name, 'rb')
 
     # The ``path`` and ``url`` properties are overridden so as to not call
@@ -67,7 +71,7 @@ class ImageCacheFile(BaseIKFile, ImageFile):
 
     def _storage_attr(self, attr):
         if getattr(self, '_file', None) is None:
-            existence_required.send(self, file=self)
+            generator_registry.send(existence_required, self)
         fn = getattr(self.storage, attr)
         return fn(self.name)
 
@@ -79,6 +83,19 @@ class ImageCacheFile(BaseIKFile, ImageFile):
     def url(self):
         return self._storage_attr('url')
 
+    def aurl(self):
+        """
+        The async version of ``url``. Returns a future for the URL. Whatever
+        the cache file strategy does to make sure the file exists (e.g.
+        generating it) happens in the asyncio event loop's executor, unless
+        the file is already known to exist.
+
+        """
+        if getattr(self, '_file', None) is not None or getattr(
+                self, '_cachefile_state', None) == CacheFileState.EXISTS:
+            return resolved(self.url)
+        return run_in_executor(self._storage_attr, 'url')
+
     def generate(self, force=False):
         """
         Generate the file. If ``force`` is ``True``, the file will be generated
@@ -92,7 +109,13 @@ class ImageCacheFile(BaseIKFile, ImageFile):
         # Generate the file
         content = generate(self.generator)
 
-        actual_name = self.storage.save(self.name, content)
+        # Only our own storages know how to save atomically; others (e.g.
+        # Django's) have no ``atomic`` argument.
+        if conf.IMAGEKIT_CACHEFILE_ATOMIC_SAVE and hasattr(self.storage,
+                                                           '_save_atomic'):
+            actual_name = self.storage.save(self.name, content, atomic=True)
+        else:
+            actual_name = self.storage.save(self.name, content)
 
         # We're going to reuse the generated file, so we need to reset the pointer.
         content.seek(0)
@@ -101,8 +124,13 @@ class ImageCacheFile(BaseIKFile, ImageFile):
         # "file" attribute is accessed, it will result in a call to the storage
         # backend (in ``BaseIKFile._get_file``). Since we already have the
         # contents of the file, what would the point of that be?
-        # TODO - Figure out Django File alternative
-        self.file = File(content)
+        self.file = content
+
+        # Record the dimensions while the image is in memory, so that nobody
+        # has to open the file to find them out.
+        dimensions = get_image_dimensions(content)
+        if dimensions:
+            self._set_dimensions(dimensions)
 
         if actual_name != self.name:
             # TODO - Figure out logger or delete this
@@ -119,13 +147,64 @@ class ImageCacheFile(BaseIKFile, ImageFile):
                 )
             )
 
+    def _get_image_dimensions(self):
+        if not hasattr(self, '_dimensions_cache'):
+            get_dimensions = getattr(self.cachefile_backend, 'get_dimensions',
+                                     None)
+            dimensions = get_dimensions(self) if get_dimensions else None
+            if not dimensions and getattr(self, '_file', None) is None \
+                    and not self._known_to_exist():
+                # Work them out from the source's, so that the file doesn't
+                # have to exist yet. (Files that do exist are read instead,
+                # which is cheaper than opening the source, and the result
+                # is kept.)
+                dimensions = self._predict_dimensions()
+            if dimensions:
+                self._dimensions_cache = dimensions
+            else:
+                # Read them from the file (generating it if need be), and
+                # remember them for next time.
+                dimensions = self._read_dimensions()
+                if dimensions:
+                    self._set_dimensions(dimensions)
+        return self._dimensions_cache
+
+    def _read_dimensions(self):
+        if getattr(self, '_file', None) is None:
+            generator_registry.send(existence_required, self)
+        if getattr(self, '_file', None) is None:
+            # Only fetch as much of the file as it takes to read its header.
+            return get_stored_image_dimensions(self.storage, self.name)
+        return super(ImageCacheFile, self)._get_image_dimensions()
+
+    def _known_to_exist(self):
+        get_state = getattr(self.cachefile_backend, 'get_state', None)
+        return bool(get_state) and get_state(
+            self, check_if_unknown=False) == CacheFileState.EXISTS
+
+    def _predict_dimensions(self):
+        predict = getattr(self.generator, 'get_output_dimensions', None)
+        if predict is None:
+            return None
+        try:
+            return predict()
+        except Exception:
+            # Whatever went wrong will come up again when the file is used.
+            return None
+
+    def _set_dimensions(self, dimensions):
+        self._dimensions_cache = tuple(dimensions)
+        set_dimensions = getattr(self.cachefile_backend, 'set_dimensions', None)
+        if set_dimensions:
+            set_dimensions(self, dimensions)
+
     def __bool__(self):
         if not self.name:
             return False
 
         # Dispatch the existence_required signal before checking to see if the
         # file exists. This gives the strategy a chance to create the file.
-        existence_required.send(self, file=self)
+        generator_registry.send(existence_required, self)
 
         try:
             check = self.cachefile_strategy.should_verify_existence(self)
@@ -148,6 +227,47 @@ class ImageCacheFile(BaseIKFile, ImageFile):
         return self.__bool__()
 
 
-# TODO - STUB
-class LazyImageCacheFile():
-    pass
\ No newline at end of file
+class LazyImageCacheFile(object):
+    """
+    A stand-in for an ``ImageCacheFile`` that doesn't look up its generator
+    until it's used. It only holds on to the generator id and arguments, so
+    it's cheap to create in bulk and can be sent to another process as long as
+    the arguments can be pickled.
+
+    """
+    def __init__(self, generator_id, **kwargs):
+        self.__dict__.update(_generator_id=generator_id, _kwargs=kwargs,
+                             _wrapped=None)
+
+    def _setup(self):
+        generator = generator_registry.get(self._generator_id, **self._kwargs)
+        self.__dict__['_wrapped'] = ImageCacheFile(generator)
+
+    def __getattr__(self, name):
+        if self._wrapped is None:
+            self._setup()
+        return getattr(self._wrapped, name)
+
+    def __setattr__(self, name, value):
+        if self._wrapped is None:
+            self._setup()
+        setattr(self._wrapped, name, value)
+
+    def __bool__(self):
+        if self._wrapped is None:
+            self._setup()
+        return bool(self._wrapped)
+
+    def __nonzero__(self):
+        # Python 2 compatibility
+        return self.__bool__()
+
+    def __getstate__(self):
+        return {'_generator_id': self._generator_id,
+                '_kwargs': self._kwargs}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _wrapped=None)
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self.name or 'None')
@@ -1,5 +1,15 @@
-from ..utils import get_singleton, get_cache, sanitize_cache_key, get_flask_app, conf
+from ..utils import (get_singleton, get_cache, sanitize_cache_key,
+                     get_flask_app, run_in_executor, conf)
+from ..django_ported import locks
+from contextlib import contextmanager
 from copy import copy
+from hashlib import md5
+from multiprocessing.pool import Pool, ThreadPool
+import errno
+import os
+import six
+import threading
+import time
 
 
 class CacheFileState(object):
@@ -27,26 +37,76 @@ class CachedFileBackend(object):
 
     """
 
+    generation_lock_timeout = 30
+    """
+    The number of seconds to wait for the generation lock of a file (which
+    another process may hold to generate the same file, or one that shares
+    its lock). If it isn't released by then, the file is checked once more
+    and, if it's still missing, generated without the lock.
+
+    """
+
     @property
     def cache(self):
         if not getattr(self, '_cache', None):
-            self._cache = get_cache
+            self._cache = get_cache()
         return self._cache
 
     def get_key(self, file):
         return sanitize_cache_key('%s%s-state' %
                                   (conf.IMAGEKIT_CACHE_PREFIX, file.name))
 
+    def get_dimensions_key(self, file):
+        return sanitize_cache_key('%s%s-dimensions' %
+                                  (conf.IMAGEKIT_CACHE_PREFIX, file.name))
+
+    def get_dimensions(self, file):
+        """
+        Returns the (width, height) recorded for the file when it was
+        generated, or ``None`` if they aren't known.
+
+        """
+        dimensions = self.cache.get(self.get_dimensions_key(file))
+        return tuple(dimensions) if dimensions else None
+
+    def set_dimensions(self, file, dimensions):
+        # The dimensions of a file never change (its name is derived from how
+        # it's generated), so they're kept for as long as the cache allows.
+        self.cache.set(self.get_dimensions_key(file), tuple(dimensions))
+
+    def prefetch_dimensions(self, files):
+        """
+        Loads the recorded dimensions of several files from the cache at once,
+        so that their ``width`` and ``height`` can be used right away.
+
+        """
+        files = [file for file in files
+                 if not hasattr(file, '_dimensions_cache')]
+        if not files:
+            return
+        keys = [self.get_dimensions_key(file) for file in files]
+        for file, dimensions in zip(files, self.cache.get_many(*keys)):
+            if dimensions:
+                file._dimensions_cache = tuple(dimensions)
+
     def get_state(self, file, check_if_unknown=True):
+        # Once a file is known to exist, the file object remembers it so that
+        # asking again (e.g. each time its URL is used) doesn't go back to the
+        # cache.
+        if getattr(file, '_cachefile_state', None) == CacheFileState.EXISTS:
+            return CacheFileState.EXISTS
         key = self.get_key(file)
         state = self.cache.get(key)
         if state is None and check_if_unknown:
             exists = self._exists(file)
             state = CacheFileState.EXISTS if exists else CacheFileState.DOES_NOT_EXIST
             self.set_state(file, state)
+        else:
+            file._cachefile_state = state
         return state
 
     def set_state(self, file, state):
+        file._cachefile_state = state
         key = self.get_key(file)
         if state == CacheFileState.DOES_NOT_EXIST:
             self.cache.set(key, state, self.existence_check_timeout)
@@ -60,14 +120,82 @@ class CachedFileBackend(object):
         state.pop('_cache', None)
         return state
 
+    def get_states(self, files, check_if_unknown=True):
+        """
+        Returns the states of several files, in the same order. The cache is
+        queried for all of them at once, and the files whose state isn't known
+        are looked up in their storage in bulk.
+
+        """
+        files = list(files)
+        if not files:
+            return []
+        keys = [self.get_key(file) for file in files]
+        states = list(self.cache.get_many(*keys))
+        unknown = [i for i, state in enumerate(states) if state is None]
+        if unknown and check_if_unknown:
+            exists = self._exists_many([files[i] for i in unknown])
+            found, missing = {}, {}
+            for i, file_exists in zip(unknown, exists):
+                if file_exists:
+                    states[i] = found[keys[i]] = CacheFileState.EXISTS
+                else:
+                    states[i] = missing[keys[i]] = CacheFileState.DOES_NOT_EXIST
+            if found:
+                self.cache.set_many(found)
+            if missing:
+                self.cache.set_many(missing, self.existence_check_timeout)
+        for file, state in zip(files, states):
+            file._cachefile_state = state
+        return states
+
     def exists(self, file):
         return self.get_state(file) == CacheFileState.EXISTS
 
+    def exists_many(self, files):
+        return [state == CacheFileState.EXISTS
+                for state in self.get_states(files)]
+
+    def _exists_many(self, files):
+        return [self._exists(file) for file in files]
+
     def generate(self, file, force=False):
         raise NotImplementedError
 
+    def agenerate(self, file, force=False):
+        """
+        The async version of ``generate()``. Returns a future; the existence
+        check and any image processing happen in the asyncio event loop's
+        executor.
+
+        """
+        return run_in_executor(self.generate, file, force=force)
+
     def generate_now(self, file, force=False):
-        if force or self.get_state(file) not in (CacheFileState.GENERATING, CacheFileState.EXISTS):
+        if not force and self.get_state(file) == CacheFileState.EXISTS:
+            return
+
+        # Only one process generates a given file at a time; everybody else
+        # waits for it to finish and then uses its result.
+        with self.generation_lock(file) as locked:
+            if not locked:
+                # The lock may be held for an unrelated file that shares it,
+                # so don't give up on this one; at worst it's generated twice.
+                get_flask_app().logger.warning(
+                    "Timed out waiting for the generation lock of %s;"
+                    " generating it without the lock" % file.name)
+
+            if not force:
+                # Whoever held the lock before us has most likely just made
+                # the file and recorded that in the cache, which is cheaper
+                # (and fresher) to ask than the storage.
+                if self.cache.get(self.get_key(file)) == CacheFileState.EXISTS:
+                    file._cachefile_state = CacheFileState.EXISTS
+                    return
+                if self._exists(file):
+                    self.set_state(file, CacheFileState.EXISTS)
+                    return
+
             self.set_state(file, CacheFileState.GENERATING)
             try:
                 file._generate()
@@ -76,6 +204,59 @@ class CachedFileBackend(object):
                 get_flask_app().logger.warning("Exception generating file, marking file as not existing: %s" % err)
                 self.set_state(file, CacheFileState.DOES_NOT_EXIST)
 
+    def get_lock_path(self, file):
+        # Files share a fixed number of lock files (so that the lock directory
+        # doesn't grow with every file ever generated). Two files that share a
+        # lock just can't be generated at the same time.
+        key = self.get_key(file)
+        if isinstance(key, six.text_type):
+            key = key.encode('utf-8')
+        stripe = int(md5(key).hexdigest(), 16) % conf.IMAGEKIT_GENERATION_LOCK_STRIPES
+        return os.path.join(conf.IMAGEKIT_GENERATION_LOCK_DIR,
+                            '%d.lock' % stripe)
+
+    @contextmanager
+    def generation_lock(self, file):
+        """
+        Holds an exclusive, cross-process lock on the file for the duration of
+        the block. Yields ``False`` if the lock couldn't be acquired within
+        ``generation_lock_timeout`` seconds.
+
+        """
+        path = self.get_lock_path(file)
+        held = _get_held_locks()
+        if path in held:
+            # This thread already holds the lock, for another file that
+            # shares it (e.g. one whose generation needs this one as its
+            # source). Nobody else can hold it, so carry on.
+            yield True
+            return
+
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+        # Lock files are left in place (there are only so many of them);
+        # removing them would let a process that is already waiting on the
+        # old file race with one that creates a new one.
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            locked = _acquire_lock(fd, self.generation_lock_timeout)
+            if locked:
+                held.add(path)
+            try:
+                yield locked
+            finally:
+                if locked:
+                    held.discard(path)
+                    locks.unlock(fd)
+        finally:
+            os.close(fd)
+
 
 class Simple(CachedFileBackend):
     """
@@ -90,3 +271,151 @@ class Simple(CachedFileBackend):
     def _exists(self, file):
         return bool(getattr(file, '_file', None)
                     or file.storage.exists(file.name))
+
+    def _exists_many(self, files):
+        results = [bool(getattr(file, '_file', None)) for file in files]
+        by_storage = {}
+        for i, file in enumerate(files):
+            if not results[i]:
+                by_storage.setdefault(file.storage, []).append(i)
+        for storage, indexes in by_storage.items():
+            names = [files[i].name for i in indexes]
+            for i, file_exists in zip(indexes, storage.exists_many(names)):
+                results[i] = file_exists
+        return results
+
+
+_local = threading.local()
+
+
+def _get_held_locks():
+    # The paths of the generation locks held by the current thread. (File
+    # locks aren't reentrant, so taking one again would wait for ourselves.)
+    held = getattr(_local, 'held_locks', None)
+    if held is None:
+        held = _local.held_locks = set()
+    return held
+
+
+def _acquire_lock(fd, timeout):
+    if not locks.LOCK_EX:
+        # File locking isn't supported on this platform.
+        return True
+    deadline = time.time() + timeout
+    while not locks.lock(fd, locks.LOCK_EX | locks.LOCK_NB):
+        if time.time() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _generate_file(backend, file, force=False):
+    backend.generate_now(file, force=force)
+
+
+class BaseAsync(Simple):
+    """
+    Base class for cache file backends that generate files asynchronously.
+
+    """
+    is_async = True
+
+    def generate(self, file, force=False):
+        # Schedule the file for generation, unless we know for sure we don't
+        # need to. We don't want to force a costly existence check here; if an
+        # already-generated file sneaks through, ``generate_now`` will catch
+        # it.
+        state = self.get_state(file, check_if_unknown=False)
+        if force or state not in (CacheFileState.GENERATING, CacheFileState.EXISTS):
+            self.set_state(file, CacheFileState.GENERATING)
+            self.schedule_generation(file, force=force)
+
+    def schedule_generation(self, file, force=False):
+        # Override this to have the file generated in the background, e.g. in
+        # a worker queue.
+        raise NotImplementedError
+
+
+class LocalPool(BaseAsync):
+    """
+    A file backend that generates files in a pool of workers owned by the
+    current process. The URL of the file is available right away; the image
+    itself shows up once the worker is done with it.
+
+    """
+
+    pool_class = ThreadPool
+    """
+    The pool used to run the workers. Any class with the interface of
+    ``multiprocessing.pool.Pool`` will do.
+
+    """
+
+    pool_size = None
+    """
+    The number of workers in the pool. Defaults to
+    ``IMAGEKIT_ASYNC_POOL_SIZE``, or the number of CPUs if that's not set.
+
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        # Pools don't survive a fork, so each process gets its own.
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    size = self.pool_size or conf.IMAGEKIT_ASYNC_POOL_SIZE
+                    self._pool = self.pool_class(size or None)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def schedule_generation(self, file, force=False):
+        def on_error(error):
+            # Generation errors are handled by ``generate_now``; this is for
+            # everything else (e.g. a file that can't be pickled). Without it
+            # the file would be left GENERATING, so nobody would try again.
+            get_flask_app().logger.warning(
+                "Exception scheduling generation of %s, marking file as not"
+                " existing: %s" % (file.name, error))
+            self.set_state(file, CacheFileState.DOES_NOT_EXIST)
+
+        kwargs = {}
+        if six.PY3:
+            # Python 2's pools can't report errors.
+            kwargs['error_callback'] = on_error
+        self.pool.apply_async(_generate_file, (self, file, force), **kwargs)
+
+    def __getstate__(self):
+        state = super(LocalPool, self).__getstate__()
+        # Pools and locks can't be pickled; the worker doesn't need them.
+        state.update(_pool=None, _pool_pid=None, _pool_lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool_lock = threading.Lock()
+
+
+class Threaded(LocalPool):
+    """
+    A file backend that generates files in a pool of threads.
+
+    """
+    pool_class = ThreadPool
+
+
+class Multiprocess(LocalPool):
+    """
+    A file backend that generates files in a pool of processes. This keeps
+    image processing off of the GIL, but the backend, the file and its
+    generator must all be picklable. The state of the file is recorded by the
+    worker process, so the cache used by the backend has to be shared between
+    processes (see ``IMAGEKIT_CACHE_BACKEND``) for the parent to see it.
+
+    """
+    pool_class = Pool
@@ -6,6 +6,7 @@ choices.
 """
 
 import os
+import six
 from ..utils import format_to_extension, suggest_extension, conf
 
 
@@ -23,7 +24,7 @@ def source_name_as_path(generator):
     ``IMAGEKIT_CACHEFILE_DIR`` setting.
 
     """
-    if isinstance(generator.source, basestring):
+    if isinstance(generator.source, six.string_types):
         source_filename = generator.source
     else:
         source_filename = getattr(generator.source, 'name', None)
@@ -14,6 +14,33 @@ class JustInTime(object):
         file.generate()
 
 
+class Optimistic(object):
+    """
+    A strategy that acts immediately when the source file changes and assumes
+    that the cache files will not be removed (i.e. it doesn't ensure the
+    cache file exists when it's accessed). Getting the URL of a file never
+    touches the storage or the cache.
+
+    Files are generated when their source is saved. That relies on
+    ``source_saved`` being dispatched, which happens when the model sends
+    ``flask_imagekit.signals.post_save`` (mongoengine documents do so
+    automatically; see ``ModelSignalRouter``). Files whose sources were saved
+    some other way, or before this strategy was in use, have to be made up
+    front with the ``generateimages`` command. Should a file's contents be
+    needed (e.g. to read it) it's generated then if it's missing.
+
+    """
+
+    def on_source_saved(self, file):
+        file.generate()
+
+    def on_content_required(self, file):
+        file.generate()
+
+    def should_verify_existence(self, file):
+        return False
+
+
 class DictStrategy(object):
     def __init__(self, callbacks):
         for k, v in callbacks.items():
@@ -0,0 +1,169 @@
+import re
+import sys
+import time
+from multiprocessing import Pool
+import click
+from flask.cli import with_appcontext
+from .cachefiles.backends import CacheFileState
+from .registry import generator_registry, cachefile_registry, source_group_registry
+from .specs import share_source
+from .specs.sourcegroups import SourceGroupFilesGenerator
+
+GENERATED = 'generated'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+def compile_pattern(generator_id):
+    """
+    Compiles a generator id pattern. ``*`` matches all characters within a
+    segment and ``**`` matches across segments (segments are separated with
+    colons). Subsegments are always matched, so "a" matches "a" as well as
+    "a:b" and "a:b:c".
+
+    """
+    parts = re.split(r'(\*{1,2})', generator_id)
+    pattern = ''
+    for part in parts:
+        if part == '*':
+            pattern += '[^:]*'
+        elif part == '**':
+            pattern += '.*'
+        else:
+            pattern += re.escape(part)
+    return re.compile('^%s(:.*)?$' % pattern)
+
+
+def get_generator_ids(patterns=None):
+    generator_ids = sorted(generator_registry.get_ids())
+    if patterns:
+        patterns = [compile_pattern(p) for p in patterns]
+        generator_ids = [id for id in generator_ids
+                         if any(p.match(id) for p in patterns)]
+    return generator_ids
+
+
+def iter_cachefile_batches(generator_ids, echo=None):
+    """
+    Yields the registered cache files of the given generators in lists of
+    files that can be generated together. The files of source groups are
+    batched by source, so each source is only decoded once.
+
+    """
+    echo = echo or (lambda message: None)
+    echo('Generating source group files for %s' % ', '.join(generator_ids))
+    for files in source_group_registry.get_cachefile_batches(generator_ids):
+        yield files
+
+    for generator_id in generator_ids:
+        for cachefiles in cachefile_registry.get_cachefiles(generator_id):
+            if isinstance(cachefiles, SourceGroupFilesGenerator):
+                continue
+            echo('Generating files for %s' % generator_id)
+            for file in cachefiles():
+                yield [file]
+
+
+def _generate_files(args):
+    """
+    Generates a batch of cache files. This runs in the worker processes, so
+    it only returns plain values.
+
+    """
+    files, force = args
+    try:
+        share_source([file.generator for file in files])
+    except Exception:
+        # Each file will run into (and report) the problem on its own.
+        pass
+    return [_generate_file(file, force) for file in files]
+
+
+def _generate_file(file, force):
+    try:
+        name = file.name
+        if not name:
+            return None, SKIPPED, None
+        backend = file.cachefile_backend
+        if not force and backend.exists(file):
+            return name, SKIPPED, None
+
+        # Files are generated synchronously here, whatever the backend
+        # normally does; the pool is what makes this asynchronous.
+        backend.generate_now(file, force=force)
+        if backend.get_state(file, check_if_unknown=False) != CacheFileState.EXISTS:
+            return name, FAILED, 'See the log for details.'
+        return name, GENERATED, None
+    except Exception as err:
+        return getattr(file, 'name', None), FAILED, str(err)
+
+
+def generate_images(generator_ids, force=False, workers=1, echo=None,
+                    progress_interval=5):
+    """
+    Generates the registered cache files of the given generators, using a
+    pool of ``workers`` processes. Files that already exist are skipped
+    (unless ``force`` is set), so an interrupted run can simply be started
+    again. Returns a dict counting the files that were generated, skipped
+    and that failed.
+
+    """
+    echo = echo or (lambda message: sys.stdout.write('%s\n' % message))
+    counts = {GENERATED: 0, SKIPPED: 0, FAILED: 0}
+
+    jobs = ((files, force) for files in
+            iter_cachefile_batches(generator_ids, echo=echo))
+
+    pool = Pool(workers) if workers > 1 else None
+    if pool:
+        batches = pool.imap_unordered(_generate_files, jobs, chunksize=4)
+    else:
+        batches = (_generate_files(job) for job in jobs)
+
+    start = last_report = time.time()
+    try:
+        for name, status, error in (r for batch in batches for r in batch):
+            counts[status] += 1
+            if status == FAILED:
+                echo('  Failed %s: %s' % (name, error))
+            now = time.time()
+            if now - last_report >= progress_interval:
+                last_report = now
+                echo(_format_progress(counts, now - start))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    echo(_format_progress(counts, time.time() - start))
+    return counts
+
+
+def _format_progress(counts, elapsed):
+    total = sum(counts.values())
+    return ('%d files (%d generated, %d skipped, %d failed) in %.1fs,'
+            ' %.1f files/s' % (total, counts[GENERATED], counts[SKIPPED],
+                               counts[FAILED], elapsed,
+                               total / elapsed if elapsed else 0))
+
+
+@click.command('generateimages')
+@click.argument('generator_ids', nargs=-1)
+@click.option('--force', is_flag=True,
+              help='Force generation of images, even if they already exist.')
+@click.option('--workers', '-w', type=int, default=1,
+              help='The number of processes to generate images with.')
+@with_appcontext
+def generateimages(generator_ids, force, workers):
+    """
+    Generate files for the specified image generators (or all of them if none
+    was provided). Simple, glob-like wildcards are allowed, with * matching
+    all characters within a segment, and ** matching across segments.
+    (Segments are separated with colons.) So, for example, "a:*:c" will match
+    "a:b:c", but not "a:b:x:c", whereas "a:**:c" will match both.
+
+    """
+    counts = generate_images(get_generator_ids(generator_ids), force=force,
+                             workers=workers, echo=click.echo)
+    if counts[FAILED]:
+        sys.exit(1)
@@ -1,7 +1,7 @@
 class Conf():
 
     def set_configs(self, **kwargs):
-        for key in kwargs.keys():
+        for key in list(kwargs):
             if hasattr(self, key):
                 setattr(self, key, kwargs.pop(key))
 
@@ -10,21 +10,44 @@ class Conf():
     MEDIA_URL = '/static/'
     FILE_UPLOAD_PERMISSIONS = None
     FILE_UPLOAD_DIRECTORY_PERMISSIONS = None
+    FILE_UPLOAD_FSYNC = False
 
     S3_KEY = None
     S3_SECRET = None
     S3_BUCKET = None
+    S3_REGION = None
+    S3_ENDPOINT_URL = None
+    S3_ACL = 'public-read'
+    S3_MAX_POOL_CONNECTIONS = 20
+    S3_MAX_ATTEMPTS = 5
+    S3_CONNECT_TIMEOUT = 5
+    S3_READ_TIMEOUT = 30
+    S3_KEY_INDEX_TTL = 60
+    S3_KEY_INDEX_MAX_KEYS = 100000
+    S3_KEY_INDEX_DIRECTORY_KEYS = 1000
+    S3_READ_AHEAD_SIZE = 1024 * 1024
+    S3_READ_SPOOL_SIZE = 5 * 1024 * 1024
+    S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+    S3_MULTIPART_PART_SIZE = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY = 4
 
     BASE_PREFIX = ''
 
     IMAGEKIT_CACHEFILE_NAMER = 'flask_imagekit.cachefiles.namers.hash'
     IMAGEKIT_SPEC_CACHEFILE_NAMER = 'flask_imagekit.cachefiles.namers.source_name_as_path'
     IMAGEKIT_CACHEFILE_DIR = 'CACHE/images'
+    IMAGEKIT_CACHEFILE_ATOMIC_SAVE = True
+    IMAGEKIT_SPEC_HASHER = 'flask_imagekit.hashers.pickle'
+    IMAGEKIT_SPEC_NAME_CACHE_SIZE = 10000
     IMAGEKIT_DEFAULT_CACHEFILE_BACKEND = 'flask_imagekit.cachefiles.backends.Simple'
     IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY = 'flask_imagekit.cachefiles.strategies.JustInTime'
+    IMAGEKIT_ASYNC_POOL_SIZE = None
+    IMAGEKIT_GENERATION_LOCK_DIR = '/tmp/flask-imagekit-locks/'
+    IMAGEKIT_GENERATION_LOCK_STRIPES = 256
 
     IMAGEKIT_DEFAULT_FILE_STORAGE = 'flask_imagekit.django_ported.storage.FileSystemStorage'
 
     IMAGEKIT_CACHE_BACKEND = None
+    IMAGEKIT_CACHE_OPTIONS = {}
     IMAGEKIT_CACHE_PREFIX = 'imagekit:'
     IMAGEKIT_USE_MEMCACHED_SAFE_CACHE_KEY = False
@@ -214,9 +214,6 @@ def get_image_dimensions(file_or_path, close=False):
     'close' to True to close the file at the end if it is initially in an open
     state.
     """
-    from PIL import ImageFile as PillowImageFile
-
-    p = PillowImageFile.Parser()
     if hasattr(file_or_path, 'read'):
         file = file_or_path
         file_pos = file.tell()
@@ -225,29 +222,52 @@ def get_image_dimensions(file_or_path, close=False):
         file = open(file_or_path, 'rb')
         close = True
     try:
-        # Most of the time Pillow only needs a small chunk to parse the image
-        # and get the dimensions, but with some TIFF files Pillow needs to
-        # parse the whole file.
-        chunk_size = 1024
-        while 1:
-            data = file.read(chunk_size)
-            if not data:
-                break
-            try:
-                p.feed(data)
-            except Exception as e:
-                # ignore zlib complaining on truncated stream, just feed more
-                # data to parser (ticket #19457).
-                if e.args[0].startswith("Error -5"):
-                    pass
-                else:
-                    raise
-            if p.image:
-                return p.image.size
-            chunk_size *= 2
-        return None
+        return _parse_image_dimensions(file.read)
     finally:
         if close:
             file.close()
         else:
-            file.seek(file_pos)
\ No newline at end of file
+            file.seek(file_pos)
+
+
+def get_stored_image_dimensions(storage, name, chunk_size=4096):
+    """
+    Returns the (width, height) of an image in a storage. Only the start of
+    the file is fetched (using the storage's ``read_range()``), so that
+    finding out the size of an image in a remote storage doesn't mean
+    downloading all of it.
+    """
+    position = [0]
+
+    def read(size):
+        data = storage.read_range(name, position[0], size)
+        position[0] += len(data)
+        return data
+
+    return _parse_image_dimensions(read, chunk_size)
+
+
+def _parse_image_dimensions(read, chunk_size=1024):
+    from PIL import ImageFile as PillowImageFile
+
+    p = PillowImageFile.Parser()
+    # Most of the time Pillow only needs a small chunk to parse the image
+    # and get the dimensions, but with some TIFF files Pillow needs to
+    # parse the whole file.
+    while 1:
+        data = read(chunk_size)
+        if not data:
+            break
+        try:
+            p.feed(data)
+        except Exception as e:
+            # ignore zlib complaining on truncated stream, just feed more
+            # data to parser (ticket #19457).
+            if e.args[0].startswith("Error -5"):
+                pass
+            else:
+                raise
+        if p.image:
+            return p.image.size
+        chunk_size *= 2
+    return None
@@ -16,6 +16,7 @@ Example Usage::
     ...     locks.lock(f, locks.LOCK_EX)
     ...     f.write('Django')
 """
+import errno
 import os
 
 __all__ = ('LOCK_EX', 'LOCK_SH', 'LOCK_NB', 'lock', 'unlock')
@@ -105,9 +106,16 @@ else:
             return True
     else:
         def lock(f, flags):
-            ret = fcntl.flock(_fd(f), flags)
-            return (ret == 0)
+            # fcntl.flock() returns None on success and raises when a
+            # non-blocking lock is already held elsewhere.
+            try:
+                fcntl.flock(_fd(f), flags)
+            except (IOError, OSError) as e:
+                if e.errno in (errno.EAGAIN, errno.EACCES):
+                    return False
+                raise
+            return True
 
         def unlock(f):
-            ret = fcntl.flock(_fd(f), fcntl.LOCK_UN)
-            return (ret == 0)
+            fcntl.flock(_fd(f), fcntl.LOCK_UN)
+            return True
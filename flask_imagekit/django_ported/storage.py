@@ -1,18 +1,34 @@
 import errno
+import io
+import mimetypes
 import os
-import locks
 import shutil
-from StringIO import StringIO
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from inspect import getargspec
-from urlparse import urljoin
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+from six.moves.queue import Queue
+try:
+    from inspect import getfullargspec as getargspec
+except ImportError:
+    # Python 2 compatible
+    from inspect import getargspec
+from six.moves.urllib.parse import urljoin
+from . import locks
 from .files import File
 from .utils import get_valid_filename, get_random_string, filepath_to_uri
-from ..utils import conf
+from ..utils import conf, run_in_executor, resolved
 from ..exceptions import SuspiciousFileOperation
 
 __all__ = ('Storage', 'FileSystemStorage')
 
+# os.rename() replaces an existing file atomically on POSIX, but not on
+# Windows; Python 3 has os.replace() for that.
+_replace = getattr(os, 'replace', os.rename)
+
 class Storage(object):
     """
     A base storage class, providing some default behaviors that all other
@@ -28,11 +44,13 @@ class Storage(object):
         """
         return self._open(name, mode)
 
-    def save(self, name, content, max_length=None):
+    def save(self, name, content, max_length=None, atomic=False):
         """
         Saves new content to the file specified by name. The content should be
         a proper File object or any python file-like object, ready to be read
-        from the beginning.
+        from the beginning. If ``atomic`` is set, the content is saved under
+        exactly that name, replacing any existing file without anybody ever
+        seeing a partially written one (where the storage system supports it).
         """
         # Get the proper name for the file, as it will actually be saved.
         if name is None:
@@ -41,17 +59,42 @@ class Storage(object):
         if not hasattr(content, 'chunks'):
             content = File(content)
 
-        args, varargs, varkw, defaults = getargspec(self.get_available_name)
-        if 'max_length' in args:
-            name = self.get_available_name(name, max_length=max_length)
+        if atomic:
+            name = self._save_atomic(name, content)
         else:
-            name = self.get_available_name(name)
+            args = getargspec(self.get_available_name)[0]
+            if 'max_length' in args:
+                name = self.get_available_name(name, max_length=max_length)
+            else:
+                name = self.get_available_name(name)
 
-        name = self._save(name, content)
+            name = self._save(name, content)
 
         # Store filenames with forward slashes, even on Windows
         return str(name.replace('\\', '/'))
 
+    def _save_atomic(self, name, content):
+        """
+        Saves the content under exactly the given name, replacing any existing
+        file. Storage systems that can do this atomically should override
+        this; by default the content is saved under an available name.
+        """
+        return self._save(self.get_available_name(name), content)
+
+    # Async versions of the above, for use from an asyncio event loop. They
+    # return futures; the blocking calls are made in the loop's executor.
+    # Storage systems with a native async client can override them.
+
+    def aopen(self, name, mode='rb'):
+        return run_in_executor(self.open, name, mode)
+
+    def asave(self, name, content, max_length=None, atomic=False):
+        return run_in_executor(self.save, name, content,
+                               max_length=max_length, atomic=atomic)
+
+    def aexists(self, name):
+        return run_in_executor(self.exists, name)
+
     # These methods are part of the public API, with default implementations.
 
     def get_valid_name(self, name):
@@ -92,6 +135,19 @@ class Storage(object):
                 name = os.path.join(dir_name, "%s_%s%s" % (file_root, get_random_string(7), file_ext))
         return name
 
+    def read_range(self, name, offset, length):
+        """
+        Returns (up to) ``length`` bytes of the file, starting at ``offset``.
+        Storage systems that can fetch part of a file without transferring the
+        rest should override this.
+        """
+        file = self.open(name, 'rb')
+        try:
+            file.seek(offset)
+            return file.read(length)
+        finally:
+            file.close()
+
     def path(self, name):
         """
         Returns a local filesystem path where the file can be retrieved using
@@ -116,6 +172,14 @@ class Storage(object):
         """
         raise NotImplementedError('subclasses of Storage must provide an exists() method')
 
+    def exists_many(self, names):
+        """
+        Returns a list of booleans telling whether each of the given names
+        exists in the storage system. Storage systems that can check many files
+        with fewer round-trips should override this.
+        """
+        return [self.exists(name) for name in names]
+
     def listdir(self, path):
         """
         Lists the contents of the specified path, returning a 2-tuple of lists;
@@ -164,7 +228,7 @@ class FileSystemStorage(Storage):
     """
 
     def __init__(self, location=None, base_url=None, file_permissions_mode=None,
-            directory_permissions_mode=None):
+            directory_permissions_mode=None, fsync=None):
         if location is None:
             location = conf.MEDIA_ROOT
         self.base_location = location
@@ -182,18 +246,16 @@ class FileSystemStorage(Storage):
             directory_permissions_mode if directory_permissions_mode is not None
             else conf.FILE_UPLOAD_DIRECTORY_PERMISSIONS
         )
+        self.fsync = fsync if fsync is not None else conf.FILE_UPLOAD_FSYNC
 
     def _open(self, name, mode='rb'):
         return File(open(self.path(name), mode))
 
-    def _save(self, name, content):
-        full_path = self.path(name)
-
+    def _create_directory(self, directory):
         # Create any intermediate directories that do not exist.
         # Note that there is a race between os.path.exists and os.makedirs:
         # if os.makedirs fails with EEXIST, the directory was created
         # concurrently, and we can continue normally. Refs #16082.
-        directory = os.path.dirname(full_path)
         if not os.path.exists(directory):
             try:
                 if self.directory_permissions_mode is not None:
@@ -212,6 +274,10 @@ class FileSystemStorage(Storage):
         if not os.path.isdir(directory):
             raise IOError("%s exists and is not a directory." % directory)
 
+    def _save(self, name, content):
+        full_path = self.path(name)
+        self._create_directory(os.path.dirname(full_path))
+
         # There's a potential race condition between get_available_name and
         # saving the file; it's possible that two threads might return the
         # same name, at which point all sorts of fun happens. So we need to
@@ -235,11 +301,17 @@ class FileSystemStorage(Storage):
                     _file = None
                     try:
                         locks.lock(fd, locks.LOCK_EX)
-                        for chunk in content.chunks():
-                            if _file is None:
-                                mode = 'wb' if isinstance(chunk, bytes) else 'wt'
-                                _file = os.fdopen(fd, mode)
-                            _file.write(chunk)
+                        # In-memory content is written in one go, straight
+                        # from its buffer.
+                        if hasattr(content, 'getbuffer'):
+                            _file = os.fdopen(fd, 'wb')
+                            _file.write(content.getbuffer())
+                        else:
+                            for chunk in content.chunks():
+                                if _file is None:
+                                    mode = 'wb' if isinstance(chunk, bytes) else 'wt'
+                                    _file = os.fdopen(fd, mode)
+                                _file.write(chunk)
                     finally:
                         locks.unlock(fd)
                         if _file is not None:
@@ -262,6 +334,57 @@ class FileSystemStorage(Storage):
 
         return name
 
+    def _save_atomic(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        self._create_directory(directory)
+
+        # Write to a temporary file next to the final one and then move it
+        # into place. Readers see either the old file or the complete new
+        # one, and concurrent writers need neither a lock nor a new name.
+        file_root, file_ext = os.path.splitext(os.path.basename(full_path))
+        while True:
+            tmp_path = os.path.join(directory, '.%s_%s%s.tmp' % (
+                file_root, get_random_string(7), file_ext))
+            try:
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL |
+                             getattr(os, 'O_BINARY', 0), 0o666)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            else:
+                break
+
+        try:
+            with os.fdopen(fd, 'wb') as _file:
+                if hasattr(content, 'getbuffer'):
+                    _file.write(content.getbuffer())
+                else:
+                    for chunk in content.chunks():
+                        _file.write(chunk)
+                if self.fsync:
+                    _file.flush()
+                    os.fsync(_file.fileno())
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            _replace(tmp_path, full_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        if self.fsync and hasattr(os, 'O_DIRECTORY'):
+            # Make sure the rename itself survives a crash.
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        return name
+
     def delete(self, name):
         assert name, "The name argument is not allowed to be empty."
         name = self.path(name)
@@ -279,6 +402,31 @@ class FileSystemStorage(Storage):
     def exists(self, name):
         return os.path.exists(self.path(name))
 
+    def exists_many(self, names):
+        # Group the names by directory so that each directory is only listed
+        # once. Directories holding a single name are cheaper to stat.
+        paths = [os.path.split(os.path.normpath(self.path(name)))
+                 for name in names]
+        counts = {}
+        for directory, basename in paths:
+            counts[directory] = counts.get(directory, 0) + 1
+
+        listings = {}
+        results = []
+        for directory, basename in paths:
+            if counts[directory] == 1:
+                results.append(os.path.exists(os.path.join(directory, basename)))
+                continue
+            if directory not in listings:
+                try:
+                    listings[directory] = set(os.listdir(directory))
+                except OSError as e:
+                    if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                        raise
+                    listings[directory] = set()
+            results.append(basename in listings[directory])
+        return results
+
     def listdir(self, path):
         path = self.path(path)
         directories, files = [], []
@@ -310,13 +458,106 @@ class FileSystemStorage(Storage):
         return datetime.fromtimestamp(os.path.getmtime(self.path(name)))
 
 
+class InMemoryStorage(Storage):
+    """
+    A storage that keeps files in a dict, for tests and development. Nothing
+    it does blocks, so its async methods don't use the executor.
+    """
+    def __init__(self, base_url=None):
+        if base_url is None:
+            base_url = conf.MEDIA_URL
+        elif not base_url.endswith('/'):
+            base_url += '/'
+        self.base_url = base_url
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode:
+            raise ValueError('InMemoryStorage files can only be saved,'
+                             ' not opened for writing.')
+        try:
+            content = self._files[name][0]
+        except KeyError:
+            raise IOError('File does not exist: %s' % name)
+        return File(BytesIO(content), name)
+
+    def _save(self, name, content):
+        data = b''.join(content.chunks())
+        with self._lock:
+            self._files[name] = data, datetime.now()
+        return name
+
+    def _save_atomic(self, name, content):
+        # Files are replaced with a single assignment.
+        return self._save(name, content)
+
+    def aopen(self, name, mode='rb'):
+        return resolved(self.open(name, mode))
+
+    def asave(self, name, content, max_length=None, atomic=False):
+        return resolved(self.save(name, content, max_length=max_length,
+                                  atomic=atomic))
+
+    def aexists(self, name):
+        return resolved(self.exists(name))
+
+    def delete(self, name):
+        with self._lock:
+            self._files.pop(name, None)
+
+    def exists(self, name):
+        return name in self._files
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/' if path else ''
+        directories, files = set(), []
+        for name in list(self._files):
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if '/' in rest:
+                directories.add(rest.split('/', 1)[0])
+            else:
+                files.append(rest)
+        return sorted(directories), sorted(files)
+
+    def size(self, name):
+        try:
+            return len(self._files[name][0])
+        except KeyError:
+            raise IOError('File does not exist: %s' % name)
+
+    def read_range(self, name, offset, length):
+        try:
+            return self._files[name][0][offset:offset + max(length, 0)]
+        except KeyError:
+            raise IOError('File does not exist: %s' % name)
+
+    def url(self, name):
+        if self.base_url is None:
+            raise ValueError("This file is not accessible via a URL.")
+        return urljoin(self.base_url, filepath_to_uri(name))
+
+    def created_time(self, name):
+        try:
+            return self._files[name][1]
+        except KeyError:
+            raise IOError('File does not exist: %s' % name)
+
+    accessed_time = modified_time = created_time
+
+
 class S3Storage(Storage):
     """
-    Amazon Simple Storage Service using Boto
+    Amazon Simple Storage Service using boto3
 
-    This storage backend supports opening files in read or write
-    mode and supports streaming(buffering) data in chunks to S3
-    when writing.
+    A single boto3 client is shared by all of the threads of a process (boto3
+    clients are thread-safe). It keeps a pool of up to
+    ``S3_MAX_POOL_CONNECTIONS`` keep-alive connections and retries failed
+    requests with exponential backoff, up to ``S3_MAX_ATTEMPTS`` times. Set
+    ``S3_ENDPOINT_URL`` to use an S3-compatible service (or a local stand-in
+    such as moto's server).
 
     This is based on iserko's "django-storages"
     (https://github.com/iserko/django-storages/blob/master/storages/backends/s3boto.py)
@@ -332,73 +573,253 @@ class S3Storage(Storage):
             base_url += '/'
         self.base_url = base_url
 
-        self.s3_key = conf.S3_KEY
-        self.s3_secret = conf.S3_SECRET
-        self.s3_bucket = conf.S3_BUCKET
+        self.s3_key = kwargs.get('s3_key', conf.S3_KEY)
+        self.s3_secret = kwargs.get('s3_secret', conf.S3_SECRET)
+        self.s3_bucket = kwargs.get('s3_bucket', conf.S3_BUCKET)
+        self.region = kwargs.get('region', conf.S3_REGION)
+        self.endpoint_url = kwargs.get('endpoint_url', conf.S3_ENDPOINT_URL)
+        self.acl = kwargs.get('acl', conf.S3_ACL)
+        self.max_pool_connections = kwargs.get(
+            'max_pool_connections', conf.S3_MAX_POOL_CONNECTIONS)
+        self.max_attempts = kwargs.get('max_attempts', conf.S3_MAX_ATTEMPTS)
+        self.read_ahead_size = kwargs.get('read_ahead_size',
+                                          conf.S3_READ_AHEAD_SIZE)
+        self.read_spool_size = kwargs.get('read_spool_size',
+                                          conf.S3_READ_SPOOL_SIZE)
+        self.multipart_threshold = kwargs.get('multipart_threshold',
+                                              conf.S3_MULTIPART_THRESHOLD)
+        self.multipart_part_size = kwargs.get('multipart_part_size',
+                                              conf.S3_MULTIPART_PART_SIZE)
+        self.multipart_concurrency = kwargs.get(
+            'multipart_concurrency', conf.S3_MULTIPART_CONCURRENCY)
 
         self.prefix = conf.BASE_PREFIX
 
-        self._entries = {}
-        self._bucket = None
-        self._connection = None
-
-    @property
-    def connection(self):
-        import boto
-        if self._connection is None:
-            self._connection = boto.connect_s3(self.s3_key, self.s3_secret)
-
-        return self._connection
+        self.key_index_directory_keys = kwargs.get(
+            'key_index_directory_keys', conf.S3_KEY_INDEX_DIRECTORY_KEYS)
+        self._index = S3KeyIndex(
+            kwargs.get('key_index_ttl', conf.S3_KEY_INDEX_TTL),
+            kwargs.get('key_index_max_keys', conf.S3_KEY_INDEX_MAX_KEYS))
+        self._client = None
+        self._client_pid = None
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Clients, pools and locks can't be pickled; they're made again when
+        # they're needed.
+        state.update(_client=None, _client_pid=None, _pool=None,
+                     _pool_pid=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     @property
-    def bucket(self):
+    def client(self):
         """
-        Get the current bucket. If there is no current bucket object
-        create it.
+        The boto3 client. Each process makes its own, since connections don't
+        survive a fork.
         """
-        if self._bucket is None:
-            self._bucket = self._get_or_create_bucket(self.s3_bucket)
-        return self._bucket
+        if self._client is None or self._client_pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._client_pid != os.getpid():
+                    self._client = self._create_client()
+                    self._client_pid = os.getpid()
+        return self._client
+
+    def _create_client(self):
+        import boto3
+        from botocore.config import Config
+        config = Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=conf.S3_CONNECT_TIMEOUT,
+            read_timeout=conf.S3_READ_TIMEOUT,
+            retries={'max_attempts': self.max_attempts, 'mode': 'standard'},
+        )
+        return boto3.session.Session().client(
+            's3',
+            aws_access_key_id=self.s3_key,
+            aws_secret_access_key=self.s3_secret,
+            region_name=self.region,
+            endpoint_url=self.endpoint_url,
+            config=config,
+        )
 
-    @property
-    def entries(self):
+    def _map(self, fn, items):
         """
-        Get the locally cached files for the bucket.
+        Calls the function for each of the items, running the calls in
+        parallel (as many at a time as there are connections in the pool).
         """
-        if not self._entries:
-            self._entries = dict((entry.key, entry)
-                                 for entry in self.bucket.list(prefix=self.prefix))
-        return self._entries
-
-    def _get_or_create_bucket(self, name):
+        items = list(items)
+        if len(items) < 2:
+            return [fn(item) for item in items]
+        # Like the client, the pool's threads don't survive a fork.
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ThreadPool(self.max_pool_connections)
+                    self._pool_pid = os.getpid()
+        return self._pool.map(fn, items)
+
+    def _list_directory(self, directory):
+        """
+        Returns the set of keys directly in the directory, or ``None`` if
+        there are more than ``key_index_directory_keys`` of them. Only one
+        LIST request is made, so that a big, flat directory (like the one the
+        ``hash`` namer puts everything in) doesn't hold up the request; its
+        keys are checked one at a time instead.
+        """
+        prefix = '%s/' % directory if directory else ''
+        response = self.client.list_objects_v2(
+            Bucket=self.s3_bucket, Prefix=prefix, Delimiter='/',
+            MaxKeys=self.key_index_directory_keys)
+        if response.get('IsTruncated'):
+            return None
+        return set(entry['Key'] for entry in response.get('Contents', []))
+
+    def _get_directory_keys(self, directories):
+        """
+        Returns a dict of the keys in each of the directories. The ones that
+        aren't in the index (or whose listing expired) are listed, in parallel.
+        """
+        result = {}
+        missing = []
+        for directory in set(directories):
+            try:
+                result[directory] = self._index.get(directory)
+            except KeyError:
+                missing.append(directory)
+        for directory, keys in zip(missing,
+                                   self._map(self._list_directory, missing)):
+            self._index.set(directory, keys)
+            result[directory] = keys
+        return result
+
+    def _head(self, key):
         """
-        Retrieves a bucket if it exists, otherwise creates it.
+        Returns the metadata of the object, or ``None`` if it doesn't exist.
         """
+        from botocore.exceptions import ClientError
         try:
-            return self.connection.get_bucket(name)
-        except Exception as e:
-            raise Exception("Bucket %s does not exist, or is inaccessible: %s." % (name, e))
+            return self.client.head_object(Bucket=self.s3_bucket, Key=key)
+        except ClientError as e:
+            if _error_status(e) == 404:
+                return None
+            raise
 
     def _open(self, name, mode='rb'):
         name = self.get_name(name)
-        f = S3BotoStorageFile(name, mode, self)
-        if not f.key:
+        f = S3StorageFile(name, mode, self)
+        if 'r' in mode and f.size is None:
             raise IOError('File does not exist: %s' % name)
         return f
 
     def _save(self, name, content):
         name = self.get_name(name)
-        key = self.bucket.new_key(name)
-        key.set_contents_from_file(content)
-        key.make_public()
+        content.seek(0)
+        self._upload(name, content)
         return name
 
+    def _save_atomic(self, name, content):
+        # A PUT replaces the whole object at once.
+        return self._save(name, content)
+
+    def _get_upload_args(self, key):
+        kwargs = {'Bucket': self.s3_bucket, 'Key': key}
+        if self.acl:
+            kwargs['ACL'] = self.acl
+        content_type = mimetypes.guess_type(key)[0]
+        if content_type:
+            kwargs['ContentType'] = content_type
+        return kwargs
+
+    def _upload(self, key, body):
+        """
+        Uploads the contents of the file, with a single PUT if it's no bigger
+        than ``multipart_threshold`` or in parts, in parallel, if it is.
+        """
+        try:
+            position = body.tell()
+            body.seek(0, os.SEEK_END)
+            size = body.tell() - position
+            body.seek(position)
+        except (AttributeError, IOError, ValueError):
+            size = None
+        if size is not None and size <= self.multipart_threshold:
+            kwargs = self._get_upload_args(key)
+            kwargs['Body'] = body
+            self.client.put_object(**kwargs)
+        else:
+            upload = S3MultipartUpload(self, key)
+            try:
+                while True:
+                    data = body.read(self.multipart_part_size)
+                    if not data:
+                        break
+                    upload.write(data)
+            except BaseException:
+                upload.abort()
+                raise
+            upload.complete()
+        self._index.add(key)
+
+    def delete(self, name):
+        key = self.get_name(name)
+        self.client.delete_object(Bucket=self.s3_bucket, Key=key)
+        self._index.discard(key)
+
     def exists(self, name):
-        name = self.get_name(name)
-        if self.entries:
-            return name in self.entries
-        k = self.bucket.new_key(name)
-        return k.exists()
+        return self.exists_many([name])[0]
+
+    def exists_many(self, names):
+        # Each directory is listed once (and then kept in the index for a
+        # while) instead of sending a request per key. Directories that are
+        # too big to keep in the index are checked key by key.
+        keys = [self.get_name(name) for name in names]
+        listings = self._get_directory_keys(
+            os.path.dirname(key) for key in keys)
+        results = []
+        unlisted = []
+        for i, key in enumerate(keys):
+            listing = listings[os.path.dirname(key)]
+            if listing is None:
+                unlisted.append(i)
+                results.append(None)
+            else:
+                results.append(key in listing)
+        heads = self._map(lambda i: self._head(keys[i]) is not None, unlisted)
+        for i, exists in zip(unlisted, heads):
+            results[i] = exists
+        return results
+
+    def size(self, name):
+        head = self._head(self.get_name(name))
+        if head is None:
+            raise IOError('File does not exist: %s' % name)
+        return head['ContentLength']
+
+    def read_range(self, name, offset, length):
+        # Only fetch the bytes asked for, with an HTTP Range request.
+        return self._get_range(self.get_name(name), offset, length)
+
+    def _get_range(self, key, offset, length):
+        from botocore.exceptions import ClientError
+        if length <= 0:
+            return b''
+        try:
+            response = self.client.get_object(
+                Bucket=self.s3_bucket, Key=key,
+                Range='bytes=%d-%d' % (offset, offset + length - 1))
+        except ClientError as e:
+            if _error_status(e) == 416:
+                # The range starts past the end of the file.
+                return b''
+            raise
+        return response['Body'].read()
 
     def path(self, name):
         name = self.get_name(name)
@@ -414,114 +835,356 @@ class S3Storage(Storage):
         import os
         return os.path.join(self.prefix, name)
 
-    def _encode_name(self, name):
-        return name.encode('utf-8')
 
+class S3KeyIndex(object):
+    """
+    The keys of an S3 bucket, listed one directory at a time as they're
+    needed. A directory's listing expires ``ttl`` seconds after it was made,
+    and the least recently used listings are dropped to keep the number of
+    keys held under ``max_keys``. Keys that are saved or deleted through the
+    storage are added to or removed from the listings right away.
+    """
+
+    def __init__(self, ttl, max_keys):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._directories = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # The listings are only good for this process.
+        return {'ttl': self.ttl, 'max_keys': self.max_keys}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, directory):
+        """
+        Returns the set of keys in the directory, or ``None`` if it has too
+        many keys to be indexed. Raises ``KeyError`` if the directory hasn't
+        been listed (or its listing expired).
+        """
+        with self._lock:
+            expires, keys = self._directories.pop(directory)
+            if expires <= time.time():
+                self._size -= len(keys or ())
+                raise KeyError(directory)
+            self._directories[directory] = expires, keys
+            return keys
+
+    def set(self, directory, keys):
+        """
+        Stores the listing of the directory. ``None`` records that the
+        directory has too many keys to be indexed.
+        """
+        with self._lock:
+            old = self._directories.pop(directory, None)
+            if old is not None:
+                self._size -= len(old[1] or ())
+            self._directories[directory] = time.time() + self.ttl, keys
+            self._size += len(keys or ())
+            while self._size > self.max_keys and self._directories:
+                _, (_, evicted) = self._directories.popitem(last=False)
+                self._size -= len(evicted or ())
+
+    def add(self, key):
+        with self._lock:
+            entry = self._directories.get(os.path.dirname(key))
+            if entry is not None and entry[1] is not None \
+                    and key not in entry[1]:
+                entry[1].add(key)
+                self._size += 1
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._directories.get(os.path.dirname(key))
+            if entry is not None and entry[1] is not None \
+                    and key in entry[1]:
+                entry[1].remove(key)
+                self._size -= 1
+
+    def clear(self):
+        with self._lock:
+            self._directories.clear()
+            self._size = 0
+
+
+def _error_status(error):
+    return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+
+
+class S3ObjectReader(io.RawIOBase):
+    """
+    A seekable, read-only file over an S3 object. The object is fetched with
+    Range requests as it's read, ``read_ahead_size`` bytes (or more, if more
+    were asked for) at a time. What has been fetched is kept so that seeking
+    back doesn't fetch it again: in memory up to ``spool_size`` bytes, and in
+    a temporary file beyond that.
+    """
+
+    def __init__(self, storage, key, size, read_ahead_size, spool_size):
+        self._storage = storage
+        self.name = key
+        self.size = size
+        self.read_ahead_size = read_ahead_size
+        self._spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        self._fetched = 0
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise IOError(errno.EINVAL, 'Invalid argument')
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+        if size is None or size < 0:
+            size = self.size - self._position
+        size = max(0, min(size, self.size - self._position))
+        if not size:
+            return b''
+        self._fetch_to(self._position + size)
+        self._spool.seek(self._position)
+        data = self._spool.read(size)
+        self._position += len(data)
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def _fetch_to(self, end):
+        # The object is fetched from the start, in order, so the spool always
+        # holds its first ``_fetched`` bytes.
+        if end <= self._fetched:
+            return
+        length = max(end - self._fetched, self.read_ahead_size)
+        data = self._storage._get_range(self.name, self._fetched, length)
+        if len(data) < end - self._fetched:
+            raise IOError('Unexpected end of file: %s' % self.name)
+        self._spool.seek(self._fetched)
+        self._spool.write(data)
+        self._fetched += len(data)
+
+    def close(self):
+        if not self.closed:
+            self._spool.close()
+        super(S3ObjectReader, self).close()
+
+
+class S3MultipartUpload(object):
+    """
+    Uploads an object in parts, ``multipart_part_size`` bytes each, with
+    ``multipart_concurrency`` threads. Parts wait for a thread in a bounded
+    queue, so ``write()`` blocks when the threads fall behind and no more than
+    about twice ``multipart_concurrency`` parts are held in memory at once.
 
-class S3BotoStorageFile(File):
+    ``complete()`` must be called once everything has been written (or
+    ``abort()`` if something went wrong), otherwise S3 keeps the parts.
+    """
+
+    def __init__(self, storage, key):
+        self._storage = storage
+        self.key = key
+        self.part_size = storage.multipart_part_size
+        response = storage.client.create_multipart_upload(
+            **storage._get_upload_args(key))
+        self.upload_id = response['UploadId']
+        self._finished = False
+        self._buffer = BytesIO()
+        self._part_number = 0
+        self._parts = {}
+        self._error = None
+        self._queue = Queue(maxsize=storage.multipart_concurrency)
+        self._threads = []
+        for _ in range(storage.multipart_concurrency):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def write(self, data):
+        self._buffer.write(data)
+        if self._buffer.tell() >= self.part_size:
+            data = self._buffer.getvalue()
+            self._buffer = BytesIO()
+            end = len(data) - len(data) % self.part_size
+            for offset in range(0, end, self.part_size):
+                self._put(data[offset:offset + self.part_size])
+            self._buffer.write(data[end:])
+
+    def _put(self, data):
+        if self._error is not None:
+            raise self._error
+        self._part_number += 1
+        self._queue.put((self._part_number, data))
+
+    def _work(self):
+        client = self._storage.client
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                # Keep taking parts so that the writer doesn't block, but
+                # there's no point in uploading them.
+                continue
+            number, data = item
+            try:
+                response = client.upload_part(
+                    Bucket=self._storage.s3_bucket, Key=self.key,
+                    UploadId=self.upload_id, PartNumber=number, Body=data)
+                self._parts[number] = response['ETag']
+            except Exception as e:
+                self._error = e
+
+    def _stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def complete(self):
+        # The last part is the only one that may be smaller than part_size
+        # (and S3 wants at least one part).
+        if self._buffer.tell() or not self._part_number:
+            self._put(self._buffer.getvalue())
+            self._buffer = BytesIO()
+        self._stop()
+        if self._error is not None:
+            self.abort()
+            raise self._error
+        try:
+            self._storage.client.complete_multipart_upload(
+                Bucket=self._storage.s3_bucket, Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': number, 'ETag': self._parts[number]}
+                    for number in sorted(self._parts)]})
+        except BaseException:
+            self.abort()
+            raise
+        self._finished = True
+
+    def abort(self):
+        if self._finished:
+            return
+        self._finished = True
+        self._stop()
+        self._storage.client.abort_multipart_upload(
+            Bucket=self._storage.s3_bucket, Key=self.key,
+            UploadId=self.upload_id)
+
+
+class S3StorageFile(File):
     """
-    The default file object used by the S3BotoStorage backend.
-
-    This file implements file streaming using boto's multipart
-    uploading functionality. The file can be opened in read or
-    write mode.
-    This class extends Django's File class. However, the contained
-    data is only the data contained in the current buffer. So you
-    should not access the contained file object directly. You should
-    access the data via this class.
+    The file object used by the S3Storage backend. The file can be opened in
+    read or write mode. In read mode, the object is streamed with an
+    ``S3ObjectReader``, so it's never held in memory all at once. In write
+    mode, the contents are buffered until they pass the storage's
+    ``multipart_threshold``, after which they're sent in parts, in the
+    background, as they're written; small files are uploaded with a single
+    PUT when the file is closed.
+
     Warning: This file *must* be closed using the close() method in
     order to properly write the file to S3. Be sure to close the file
     in your application.
-
-    This is ported from iserko's "django-storages"
-    (https://github.com/iserko/django-storages/blob/master/storages/backends/s3boto.py)
-    Modified to work with flask_imagekit
     """
 
-    def __init__(self, name, mode, storage, buffer_size=5242880):
+    def __init__(self, name, mode, storage):
         self._storage = storage
-        self.name = name[len(self._storage.location):].lstrip('/')
+        self.name = name
         self._mode = mode
-        self.key = storage.bucket.get_key(self._storage._encode_name(name))
-        if not self.key and 'w' in mode:
-            self.key = storage.bucket.new_key(storage._encode_name(name))
         self._is_dirty = False
         self._file = None
         self._multipart = None
-        # 5 MB is the minimum part size (if there is more than one part).
-        # Amazon allows up to 10,000 parts.  The default supports uploads
-        # up to roughly 50 GB.  Increase the part size to accommodate
-        # for files larger than this.
-        self._write_buffer_size = buffer_size
-        self._write_counter = 0
+        self._head = storage._head(name) if 'r' in mode else None
 
     @property
     def size(self):
-        return self.key.size
+        if self._head is None:
+            return None
+        return self._head['ContentLength']
 
     @property
     def file(self):
         if self._file is None:
-            self._file = StringIO()
             if 'r' in self._mode:
                 self._is_dirty = False
-                self.key.get_contents_to_file(self._file)
-                self._file.seek(0)
+                self._file = S3ObjectReader(
+                    self._storage, self.name, self.size,
+                    self._storage.read_ahead_size,
+                    self._storage.read_spool_size)
+            else:
+                self._file = BytesIO()
         return self._file
 
     def read(self, *args, **kwargs):
         if 'r' not in self._mode:
             raise AttributeError("File was not opened in read mode.")
-        return super(S3BotoStorageFile, self).read(*args, **kwargs)
+        return super(S3StorageFile, self).read(*args, **kwargs)
 
-    def write(self, *args, **kwargs):
+    def write(self, data):
         if 'w' not in self._mode:
             raise AttributeError("File was not opened in write mode.")
         self._is_dirty = True
-        if self._multipart is None:
-            provider = self.key.bucket.connection.provider
-            upload_headers = {
-                provider.acl_header: self._storage.acl
-            }
-            upload_headers.update(self._storage.headers)
-            self._multipart = self._storage.bucket.initiate_multipart_upload(
-                self.key.name,
-                headers = upload_headers,
-                reduced_redundancy = self._storage.reduced_redundancy
-            )
-        if self._write_buffer_size <= self._buffer_file_size:
-            self._flush_write_buffer()
-        return super(S3BotoStorageFile, self).write(*args, **kwargs)
-
-    @property
-    def _buffer_file_size(self):
-        pos = self.file.tell()
-        self.file.seek(0,os.SEEK_END)
-        length = self.file.tell()
-        self.file.seek(pos)
-        return length
+        self.file.write(data)
+        if self._multipart is not None or \
+                self.file.tell() > self._storage.multipart_threshold:
+            if self._multipart is None:
+                self._multipart = S3MultipartUpload(self._storage, self.name)
+            try:
+                self._multipart.write(self.file.getvalue())
+            except BaseException:
+                self._abort()
+                raise
+            self._file = BytesIO()
+
+    def _abort(self):
+        self._multipart.abort()
+        self._multipart = None
+        self._is_dirty = False
 
-    def _flush_write_buffer(self):
-        """
-        Flushes the write buffer.
-        """
-        if self._buffer_file_size:
-            self._write_counter += 1
+    def close(self):
+        if self._multipart is not None:
+            try:
+                self._multipart.write(self.file.getvalue())
+                self._multipart.complete()
+            except BaseException:
+                self._abort()
+                raise
+            self._multipart = None
+            self._is_dirty = False
+            self._storage._index.add(self.name)
+        elif self._is_dirty:
             self.file.seek(0)
-            self._multipart.upload_part_from_file(
-                self.file,
-                self._write_counter,
-                headers=self._storage.headers
-            )
-            self.file.close()
+            self._storage._upload(self.name, self.file)
+            self._is_dirty = False
+        if self._file is not None:
+            self._file.close()
             self._file = None
 
-    def close(self):
-        if self._is_dirty:
-            self._flush_write_buffer()
-            self._multipart.complete_upload()
-        else:
-            if not self._multipart is None:
-                self._multipart.cancel_upload()
-        self.key.close()
 
+# The name this class had when S3Storage used boto.
+S3BotoStorageFile = S3StorageFile
@@ -1,7 +1,7 @@
 import re
 import random
 import string
-import urllib
+from six.moves.urllib.parse import quote
 
 def get_valid_filename(s):
     """
@@ -17,7 +17,7 @@ def get_valid_filename(s):
 
 
 def get_random_string(length):
-    return ''.join(random.choice(string.lowercase) for i in range(length))
+    return ''.join(random.choice(string.ascii_lowercase) for i in range(length))
 
 
 def filepath_to_uri(path):
@@ -37,4 +37,4 @@ def filepath_to_uri(path):
         return path
     # I know about `os.sep` and `os.altsep` but I want to leave
     # some flexibility for hardcoding separators.
-    return urllib.quote(str(path).replace(b"\\", b"/"), safe=b"/~!*()'")
+    return quote(str(path).replace("\\", "/"), safe="/~!*()'")
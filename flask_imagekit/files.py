@@ -59,4 +59,37 @@ class BaseIKFile(File):
     def close(self):
         file = getattr(self, '_file', None)
         if file is not None:
-            file.close()
\ No newline at end of file
+            file.close()
+
+
+class IKContentFile(File):
+    """
+    Wraps an in-memory file (like the ``BytesIO`` returned by
+    ``process_image``) without copying its contents. Storages can write it
+    straight from its buffer using ``getbuffer()``.
+
+    """
+
+    def __bool__(self):
+        return True
+
+    def __nonzero__(self):
+        # Python 2 compatibility
+        return self.__bool__()
+
+    def getbuffer(self):
+        """
+        Returns the contents of the file; a view on the underlying buffer
+        where that's supported, otherwise a string.
+
+        """
+        getbuffer = getattr(self.file, 'getbuffer', None)
+        if getbuffer is not None:
+            return getbuffer()
+        return self.file.getvalue()
+
+    def open(self, mode=None):
+        self.seek(0)
+
+    def close(self):
+        pass
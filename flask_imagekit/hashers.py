@@ -1,13 +1,41 @@
+"""
+Functions that hash a spec's options (its source name, processors, format,
+etc.) to produce a cache file name. Which one is used is controlled by the
+``IMAGEKIT_SPEC_HASHER`` setting.
+
+``pickle``, the default, produces the same names as earlier versions. The
+others hash a compact canonical serialization of the options, which is much
+faster to produce; switching to one of them gives every cache file a new name,
+so existing files will be generated again.
+
+"""
+import types
 from copy import copy
-from hashlib import md5
-from pickle import MARK, DICT
+from functools import partial
+from hashlib import md5 as _md5
+from pickle import MARK, DICT, dumps
 try:
     from pickle import _Pickler
 except ImportError:
     # Python 2 compatible
     from pickle import Pickler as _Pickler
+import six
+from .exceptions import ImproperlyConfigured
 from .lib import StringIO
 
+try:
+    from hashlib import blake2b as _blake2b
+except ImportError:
+    try:
+        from pyblake2 import blake2b as _blake2b
+    except ImportError:
+        _blake2b = None
+
+try:
+    import xxhash as _xxhash
+except ImportError:
+    _xxhash = None
+
 
 class CanonicalizingPickler(_Pickler):
     dispatch = copy(_Pickler.dispatch)
@@ -30,6 +58,237 @@ class CanonicalizingPickler(_Pickler):
 
 
 def pickle(obj):
+    """
+    Hashes a protocol 0 pickle of the object with MD5. This is slow, but it's
+    what cache file names have always been based on.
+
+    """
     file = StringIO()
     CanonicalizingPickler(file, 0).dump(obj)
-    return md5(file.getvalue()).hexdigest()
+    return _md5(file.getvalue()).hexdigest()
+
+
+def md5(obj):
+    """Hashes the canonical serialization of the object with MD5."""
+    return _md5(canonicalize(obj)).hexdigest()
+
+
+def blake2b(obj):
+    """
+    Hashes the canonical serialization of the object with BLAKE2b. Requires
+    Python 3.6 or the pyblake2 package.
+
+    """
+    if _blake2b is None:
+        raise ImproperlyConfigured('The blake2b hasher requires Python 3.6 or'
+                                   ' the pyblake2 package.')
+    return _blake2b(canonicalize(obj), digest_size=16).hexdigest()
+
+
+def xxhash(obj):
+    """
+    Hashes the canonical serialization of the object with xxHash (XXH64).
+    Requires the xxhash package.
+
+    """
+    if _xxhash is None:
+        raise ImproperlyConfigured('The xxhash hasher requires the xxhash'
+                                   ' package.')
+    return _xxhash.xxh64(canonicalize(obj)).hexdigest()
+
+
+def xxh3(obj):
+    """
+    Hashes the canonical serialization of the object with xxHash's XXH3 (128
+    bit). Requires version 2.0 or later of the xxhash package.
+
+    """
+    if getattr(_xxhash, 'xxh3_128', None) is None:
+        raise ImproperlyConfigured('The xxh3 hasher requires version 2.0 or'
+                                   ' later of the xxhash package.')
+    return _xxhash.xxh3_128(canonicalize(obj)).hexdigest()
+
+
+def canonicalize(obj):
+    """
+    Returns a byte string that identifies the object by its value. Equal
+    objects give equal strings, no matter the order of their dict keys or set
+    items. Functions, classes and modules are identified by their qualified
+    names. Other objects (e.g. processors) are identified by their class and
+    their state (their own ``__getstate__()``, or else their ``__dict__``).
+
+    """
+    parts = []
+    _dump(obj, parts.append)
+    return b''.join(parts)
+
+
+def _dump(obj, write):
+    dump = _dispatch.get(type(obj))
+    if dump is None:
+        for types, dump in _subclass_dispatch:
+            if isinstance(obj, types):
+                break
+        else:
+            dump = _dump_object
+    dump(obj, write)
+
+
+def _dump_none(obj, write):
+    write(b'N')
+
+
+def _dump_bool(obj, write):
+    write(b'T' if obj else b'F')
+
+
+def _dump_int(obj, write):
+    write(b'i%d;' % obj)
+
+
+def _dump_float(obj, write):
+    write(b'f%s;' % repr(obj).encode('ascii'))
+
+
+def _dump_text(obj, write):
+    # Python 2 ``str``s are treated as text too, so that u'a.jpg' and 'a.jpg'
+    # get the same name.
+    if isinstance(obj, six.text_type):
+        obj = obj.encode('utf-8')
+    write(b'u%d:' % len(obj))
+    write(obj)
+
+
+def _dump_bytes(obj, write):
+    write(b'b%d:' % len(obj))
+    write(bytes(obj))
+
+
+def _dump_sequence(obj, write):
+    write(b't' if isinstance(obj, tuple) else b'l')
+    for item in obj:
+        _dump(item, write)
+    write(b'e')
+
+
+def _dump_set(obj, write):
+    write(b's')
+    for item in sorted(canonicalize(item) for item in obj):
+        write(item)
+    write(b'e')
+
+
+def _dump_dict(obj, write):
+    write(b'd')
+    items = [(_dump_key(key), value) for key, value in obj.items()]
+    items.sort(key=_first)
+    for key, value in items:
+        write(key)
+        _dump(value, write)
+    write(b'e')
+
+
+def _dump_key(key):
+    # Most keys are names, so they get a shortcut.
+    if type(key) is str:
+        if six.PY3:
+            key = key.encode('utf-8')
+        return b'u%d:%s' % (len(key), key)
+    return canonicalize(key)
+
+
+def _first(item):
+    return item[0]
+
+
+def _dump_object(obj, write):
+    cls = obj.__class__
+    getstate = getattr(cls, '__getstate__', None)
+    # Python 3.11 gave every object a __getstate__(), which returns None for
+    # objects without attributes; only one the class defines itself is used,
+    # so that names don't depend on the version of Python.
+    if getstate is not None and getstate is not _object_getstate:
+        state = obj.__getstate__()
+    elif hasattr(obj, '__dict__'):
+        state = obj.__dict__
+    else:
+        # Not much we can do about objects without a __dict__.
+        write(b'p')
+        _dump_bytes(dumps(obj, 2), write)
+        return
+    write(b'o')
+    _dump_text(_qualified_name(cls), write)
+    _dump(state, write)
+
+
+def _dump_named(obj, write):
+    write(b'n')
+    if isinstance(obj, types.ModuleType):
+        _dump_text(obj.__name__, write)
+        return
+    name = _qualified_name(obj)
+    _dump_text(name, write)
+    code = getattr(obj, '__code__', None)
+    if code is not None and '<' in name:
+        # Lambdas (and functions defined in functions) don't have names of
+        # their own, so they're told apart by their code.
+        _dump_bytes(code.co_code, write)
+        _dump(code.co_names, write)
+        _dump(tuple(const for const in code.co_consts
+                    if not isinstance(const, types.CodeType)), write)
+
+
+def _dump_method(obj, write):
+    write(b'm')
+    _dump_text(obj.__func__.__name__, write)
+    _dump(obj.__self__, write)
+
+
+def _dump_partial(obj, write):
+    write(b'P')
+    _dump(obj.func, write)
+    _dump(obj.args, write)
+    _dump(obj.keywords or {}, write)
+
+
+def _qualified_name(obj):
+    return '%s.%s' % (getattr(obj, '__module__', None),
+                      getattr(obj, '__qualname__', obj.__name__))
+
+
+_object_getstate = getattr(object, '__getstate__', None)
+
+_dispatch = {
+    type(None): _dump_none,
+    bool: _dump_bool,
+    float: _dump_float,
+    list: _dump_sequence,
+    tuple: _dump_sequence,
+    set: _dump_set,
+    frozenset: _dump_set,
+    dict: _dump_dict,
+    partial: _dump_partial,
+    types.MethodType: _dump_method,
+}
+for _type in (types.FunctionType, types.BuiltinFunctionType, types.ModuleType,
+              type, getattr(types, 'ClassType', type)):
+    _dispatch[_type] = _dump_named
+for _type in six.integer_types:
+    _dispatch[_type] = _dump_int
+for _type in (str, six.text_type):
+    _dispatch[_type] = _dump_text
+if six.binary_type not in _dispatch:
+    _dispatch[six.binary_type] = _dump_bytes
+
+_subclass_dispatch = [
+    (bool, _dump_bool),
+    (six.integer_types, _dump_int),
+    (float, _dump_float),
+    (six.string_types + (six.text_type,), _dump_text),
+    (six.binary_type, _dump_bytes),
+    ((list, tuple), _dump_sequence),
+    ((set, frozenset), _dump_set),
+    (dict, _dump_dict),
+    (partial, _dump_partial),
+    (type, _dump_named),
+]
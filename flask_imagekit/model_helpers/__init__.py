@@ -1,4 +1,5 @@
 import os
+import six
 from ..utils import conf
 
 
@@ -12,7 +13,7 @@ def get_local_fields(model, source_fields):
     # MONGOENGINE
     if hasattr(model, '_fields') and isinstance(model._fields, dict):
         local_fields = dict((field_name, field)
-                            for field_name, field in model._fields.iteritems()
+                            for field_name, field in six.iteritems(model._fields)
                             if field_name in source_fields)
 
     return local_fields
@@ -46,7 +47,7 @@ def get_image(field):
     elif hasattr(field, 'seek') and hasattr(field, 'read'):
         # The field itself can be treated as a file like object, just return it
         return field
-    elif isinstance(field, basestring):
+    elif isinstance(field, six.string_types):
         return handle_string(field)
 
     raise Exception("Could not determine a way to extract data from the supplied field: %s" % field)
@@ -55,9 +56,9 @@ def get_image(field):
 def get_http_asset(path):
     import requests
     import shutil
-    from StringIO import StringIO
+    from io import BytesIO
 
-    file = StringIO()
+    file = BytesIO()
     r = requests.get(path, stream=True)
     if r.status_code == 200:
         shutil.copyfileobj(r.raw, file)
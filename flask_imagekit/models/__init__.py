@@ -1 +1 @@
-from .fields import ImageSpecField
\ No newline at end of file
+from .fields import ImageSpecField, prefetch_cachefiles
\ No newline at end of file
@@ -1,11 +1,15 @@
+import threading
 from functools import wraps
-from .utils import ImageSpecFileDescriptor
+from .utils import ImageSpecFileDescriptor, prefetch_cachefiles
 from ...specs import SpecHost
 from ...registry import register
 from ...signals import post_init
 from ...specs.sourcegroups import ImageFieldSourceGroup
 
 
+_bind_lock = threading.RLock()
+
+
 class SpecHostField(SpecHost):
     def _set_spec_id(self, cls, name):
         spec_id = getattr(self, 'spec_id', None)
@@ -40,32 +44,59 @@ class ImageSpecField(SpecHostField):
 
         # TODO: Allow callable for source. See https://github.com/matthewwithanm/django-imagekit/issues/158#issuecomment-10921664
         self.source = source
-        self.calling_ourselves = False
-        self.nested = False
 
-    def __get__(self, instance, owner):
+        # The (model class, attribute name) the field was bound to.
+        self._bound = None
 
-        # Because we don't have the equivalent of contribute_to_class
-        # in flask, we trigger it when the field is first gotten
-        if instance is None or self.nested:
-            self.nested = False
+    def __set_name__(self, owner, name):
+        # Python 3.6+ tells us our name when the model class is created, so we
+        # can bind to it right away.
+        self.bind(owner, name)
+
+    def __get__(self, instance, owner):
+        if instance is None:
             return self
 
-        self.nested = True
-        attrname = ''
-        for attr in [nodash for nodash in dir(owner) if not nodash.startswith('_')]:
-            if self == getattr(instance, attr):
-                attrname = attr
-                break
-        self.contribute_to_class(owner, attrname)
+        # Python 2 doesn't, so we bind ourselves the first time we're used. The
+        # instance was created before the model's __init__ was wrapped, so it
+        # hasn't had its post_init yet either.
+        bound = self._bound
+        if bound is None:
+            with _bind_lock:
+                # Another thread may have bound us while we waited, in which
+                # case we're no longer in the class dict to be found.
+                if self._bound is None:
+                    self.bind(*self._find_name(owner))
+                bound = self._bound
         post_init.send(owner, instance=instance)
 
         # This should now be set to an ImageSpecFileDescriptor
-        return getattr(instance, attrname)
+        return getattr(instance, bound[1])
+
+    def _find_name(self, owner):
+        # Only look at the class dicts, so that no other descriptors or
+        # properties are triggered.
+        for cls in owner.__mro__:
+            for name, value in vars(cls).items():
+                if value is self:
+                    return cls, name
+        raise AttributeError('%s is not a field of %s' % (self, owner.__name__))
+
+    def bind(self, cls, name):
+        """
+        Binds the field to the model class that it's defined on, replacing it
+        with an ``ImageSpecFileDescriptor``. This only happens once, even if
+        several threads try at the same time.
+
+        """
+        with _bind_lock:
+            if cls.__dict__.get(name) is self:
+                self.contribute_to_class(cls, name)
 
     def contribute_to_class(self, cls, name):
         def register_source_group(source):
             setattr(cls, name, ImageSpecFileDescriptor(self, name, source))
+            self._bound = cls, name
             self._set_spec_id(cls, name)
 
             # We don't have the equivalent of a post_init signal,
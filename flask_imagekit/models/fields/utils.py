@@ -1,5 +1,8 @@
+import six
 from ...cachefiles import ImageCacheFile
-from ...utils import get_flask_app
+from ...signals import post_init
+from ...utils import get_flask_app, call_strategy_method
+
 
 class ImageSpecFileDescriptor(object):
     def __init__(self, field, attname, source_field_name):
@@ -12,13 +15,98 @@ class ImageSpecFileDescriptor(object):
             return self.field
         else:
             source = getattr(instance, self.source_field_name)
-            spec = self.field.get_spec(source=source)
-            file = ImageCacheFile(spec)
-            if file:
-                instance.__dict__[self.attname] = file
-            else:
+            file = self.get_file(instance, source)
+            if not file.name:
                 get_flask_app().logger.warn("Imagekit file could not be created")
             return file
 
     def __set__(self, instance, value):
+        if isinstance(value, ImageCacheFile):
+            value._source_key = _get_source_key(
+                getattr(value.generator, 'source', None))
         instance.__dict__[self.attname] = value
+
+    def get_file(self, instance, source):
+        """
+        Returns the instance's cache file for the given source. It's made the
+        first time and then reused until the source changes. Making it doesn't
+        touch the cache or the storage; that's left to the cache file strategy
+        when the file is used.
+
+        """
+        key = _get_source_key(source)
+        file = instance.__dict__.get(self.attname)
+        if (isinstance(file, ImageCacheFile)
+                and getattr(file, '_source_key', _missing) == key):
+            return file
+
+        file = ImageCacheFile(self.field.get_spec(source=source))
+        file._source_key = key
+        instance.__dict__[self.attname] = file
+        return file
+
+
+_missing = object()
+
+
+def _get_source_key(source):
+    # A cache file's name depends on its source's name (see
+    # ``ImageSpec.get_hash()``), so that's how a change of source is noticed,
+    # even if the source object was updated in place.
+    if source is None or isinstance(source, six.string_types):
+        return source
+    return getattr(source, 'name', source)
+
+
+def _get_descriptor(instance, attname):
+    cls = instance.__class__
+    for klass in cls.__mro__:
+        if attname in klass.__dict__:
+            attr = klass.__dict__[attname]
+            break
+    else:
+        raise AttributeError('%s has no attribute %s' % (cls.__name__, attname))
+
+    if not isinstance(attr, ImageSpecFileDescriptor):
+        # The field hasn't been accessed yet, so it hasn't been bound to the
+        # class (on Python 2). Do what the field does on its first access.
+        attr.bind(klass, attname)
+        post_init.send(cls, instance=instance)
+        attr = klass.__dict__[attname]
+    return attr
+
+
+def prefetch_cachefiles(instances, *attnames):
+    """
+    Resolves the cache files of the given ImageSpecFields for a list of model
+    instances in one pass, so that using them afterwards (e.g. in a template
+    loop) doesn't touch the cache or the storage::
+
+        photos = list(Photo.objects.all())
+        prefetch_cachefiles(photos, 'thumbnail', 'preview')
+
+    The states of all of the files are looked up together, and files that
+    don't exist yet are handed to their cache file strategy right away. The
+    dimensions recorded for the files are loaded too, for their ``width`` and
+    ``height``.
+
+    """
+    files_by_backend = {}
+    for instance in instances:
+        for attname in attnames:
+            descriptor = _get_descriptor(instance, attname)
+            source = getattr(instance, descriptor.source_field_name)
+            if not source:
+                continue
+
+            file = descriptor.get_file(instance, source)
+            if file.name:
+                files_by_backend.setdefault(file.cachefile_backend, []).append(file)
+
+    for backend, files in files_by_backend.items():
+        for file, exists in zip(files, backend.exists_many(files)):
+            if not exists:
+                call_strategy_method(file, 'on_existence_required')
+        prefetch_dimensions = getattr(backend, 'prefetch_dimensions', None)
+        if prefetch_dimensions:
+            prefetch_dimensions(files)
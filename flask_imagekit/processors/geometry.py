@@ -0,0 +1,169 @@
+"""
+Works out the size of the image that processors will produce from the size of
+their input, without running them. This mirrors what pilkit's processors do;
+processors of other kinds can take part by defining a
+``get_output_size(size)`` method.
+
+"""
+from pilkit.lib import Image
+from pilkit.processors import (ProcessorPipeline, Adjust, Reflection,
+                               Transpose, MakeOpaque, TrimBorderColor, Crop,
+                               SmartCrop, Resize, ResizeToCover, ResizeToFill,
+                               SmartResize, ResizeCanvas, AddBorder,
+                               ResizeToFit, Thumbnail)
+
+
+# EXIF orientations that turn the image on its side.
+_SWAPPING_ORIENTATIONS = (5, 6, 7, 8)
+
+_SWAPPING_METHODS = (Image.ROTATE_90, Image.ROTATE_270,
+                     getattr(Image, 'TRANSPOSE', 5),
+                     getattr(Image, 'TRANSVERSE', 6))
+
+
+def get_output_size(processors, size, orientation=None):
+    """
+    Returns the (width, height) of the image that the processors will make
+    from an image of the given size, or ``None`` if that can't be known
+    without actually processing it.
+
+    :param orientation: The EXIF orientation of the image, which is needed to
+        predict ``Transpose(Transpose.AUTO)``. If it's ``None``, the orientation
+        is unknown.
+
+    """
+    for processor in processors or []:
+        if size is None:
+            break
+        fn = _geometry.get(type(processor))
+        if fn is not None:
+            size = fn(processor, size, orientation)
+        elif hasattr(processor, 'get_output_size'):
+            size = processor.get_output_size(size)
+        else:
+            return None
+        if size is not None:
+            size = tuple(size)
+    return size
+
+
+def _same(processor, size, orientation):
+    return size
+
+
+def _unknown(processor, size, orientation):
+    return None
+
+
+def _pipeline(processor, size, orientation):
+    return get_output_size(processor, size, orientation)
+
+
+def _transpose(processor, size, orientation):
+    if Transpose.AUTO in processor.methods:
+        if orientation is None:
+            return None
+        swap = orientation in _SWAPPING_ORIENTATIONS
+    else:
+        swap = sum(1 for method in processor.methods
+                   if method in _SWAPPING_METHODS) % 2
+    return (size[1], size[0]) if swap else size
+
+
+def _reflection(processor, size, orientation):
+    return size[0], size[1] + int(size[1] * processor.size)
+
+
+def _resize_to(width, height, size, upscale):
+    if upscale or (width < size[0] and height < size[1]):
+        return width, height
+    return size
+
+
+def _resize(processor, size, orientation):
+    return _resize_to(processor.width, processor.height, size,
+                      processor.upscale)
+
+
+def _cover(width, height, size, upscale):
+    ratio = max(float(width) / size[0], float(height) / size[1])
+    return _resize_to(int(round(size[0] * ratio)),
+                      int(round(size[1] * ratio)), size, upscale)
+
+
+def _resize_to_cover(processor, size, orientation):
+    return _cover(processor.width, processor.height, size, processor.upscale)
+
+
+def _fill(width, height, size, upscale):
+    if width is None or height is None:
+        return None
+    size = _cover(width, height, size, upscale)
+    return min(size[0], width), min(size[1], height)
+
+
+def _resize_to_fill(processor, size, orientation):
+    return _fill(processor.width, processor.height, size, processor.upscale)
+
+
+def _crop(processor, size, orientation):
+    if processor.width is None or processor.height is None:
+        return None
+    return min(size[0], processor.width), min(size[1], processor.height)
+
+
+def _resize_canvas(processor, size, orientation):
+    return processor.width, processor.height
+
+
+def _add_border(processor, size, orientation):
+    return (size[0] + processor.left + processor.right,
+            size[1] + processor.top + processor.bottom)
+
+
+def _fit(width, height, size, upscale, mat_color=None):
+    if width is not None and height is not None:
+        ratio = min(float(width) / size[0], float(height) / size[1])
+    elif width is None:
+        ratio = float(height) / size[1]
+    else:
+        ratio = float(width) / size[0]
+    size = _resize_to(int(round(size[0] * ratio)),
+                      int(round(size[1] * ratio)), size, upscale)
+    if mat_color is not None:
+        if width is None or height is None:
+            return None
+        return width, height
+    return size
+
+
+def _resize_to_fit(processor, size, orientation):
+    return _fit(processor.width, processor.height, size, processor.upscale,
+                processor.mat_color)
+
+
+def _thumbnail(processor, size, orientation):
+    if processor.crop:
+        return _fill(processor.width, processor.height, size,
+                     processor.upscale)
+    return _fit(processor.width, processor.height, size, processor.upscale)
+
+
+_geometry = {
+    ProcessorPipeline: _pipeline,
+    Adjust: _same,
+    MakeOpaque: _same,
+    Reflection: _reflection,
+    Transpose: _transpose,
+    TrimBorderColor: _unknown,
+    Crop: _crop,
+    SmartCrop: _crop,
+    Resize: _resize,
+    ResizeToCover: _resize_to_cover,
+    ResizeToFill: _resize_to_fill,
+    SmartResize: _resize_to_fill,
+    ResizeCanvas: _resize_canvas,
+    AddBorder: _add_border,
+    ResizeToFit: _resize_to_fit,
+    Thumbnail: _thumbnail,
+}
@@ -1,3 +1,4 @@
+from itertools import islice
 from .exceptions import AlreadyRegistered, NotRegistered
 from .signals import content_required, existence_required, source_saved
 from .utils import autodiscover, call_strategy_method
@@ -9,24 +10,46 @@ class GeneratorRegistry(object):
     without locking the users of the app into it.
 
     """
+    _callbacks = {
+        content_required: 'on_content_required',
+        existence_required: 'on_existence_required',
+    }
+
     def __init__(self):
         self._generators = {}
-        content_required.connect(self.content_required_receiver)
-        existence_required.connect(self.existence_required_receiver)
+        # How many ids each generator is registered under, so that telling
+        # whether a generator is registered doesn't mean scanning all of them.
+        self._generator_counts = {}
+        self._receiver_keys = {}
+        self._connect(content_required, self.content_required_receiver)
+        self._connect(existence_required, self.existence_required_receiver)
+
+    def _connect(self, signal, receiver):
+        # Remember how blinker knows the receiver, so that ``send()`` can tell
+        # whether it's the only one.
+        keys = set(signal.receivers)
+        signal.connect(receiver)
+        self._receiver_keys[signal] = (set(signal.receivers) - keys).pop()
 
     def register(self, id, generator):
         registered_generator = self._generators.get(id)
         if registered_generator and generator != self._generators[id]:
             raise AlreadyRegistered('The generator with id %s is'
                                     ' already registered' % id)
+        if id not in self._generators:
+            self._generator_counts[generator] = (
+                self._generator_counts.get(generator, 0) + 1)
         self._generators[id] = generator
 
     def unregister(self, id):
         try:
-            del self._generators[id]
+            generator = self._generators.pop(id)
         except KeyError:
             raise NotRegistered('The generator with id %s is not'
                                 ' registered' % id)
+        count = self._generator_counts.pop(generator) - 1
+        if count:
+            self._generator_counts[generator] = count
 
     def get(self, id, **kwargs):
         autodiscover()
@@ -45,6 +68,19 @@ class GeneratorRegistry(object):
         autodiscover()
         return self._generators.keys()
 
+    def send(self, signal, file):
+        """
+        Sends ``content_required`` or ``existence_required`` for the file.
+        Usually this registry is the only receiver of those, in which case
+        its strategy dispatch is called directly instead of through blinker.
+
+        """
+        receivers = signal.receivers
+        if len(receivers) == 1 and self._receiver_keys.get(signal) in receivers:
+            self._receive(file, self._callbacks[signal])
+        else:
+            signal.send(file, file=file)
+
     def content_required_receiver(self, sender, file, **kwargs):
         self._receive(file, 'on_content_required')
 
@@ -55,7 +91,7 @@ class GeneratorRegistry(object):
         generator = file.generator
 
         # FIXME: I guess this means you can't register functions?
-        if generator.__class__ in self._generators.values():
+        if generator.__class__ in self._generator_counts:
             # Only invoke the strategy method for registered generators.
             call_strategy_method(file, callback)
 
@@ -94,12 +130,28 @@ class SourceGroupRegistry(object):
             cachefile_registry.unregister(generator_id,
                     SourceGroupFilesGenerator(source_group, generator_id))
 
+    def get_cachefile_batches(self, generator_ids):
+        """
+        Yields the cache files of the given generators' source groups, in
+        lists of files that share a source, so that each list can be generated
+        from a single decode of the source.
+
+        """
+        from .cachefiles import LazyImageCacheFile
+        generator_ids = set(generator_ids)
+        for source_group, ids in self._source_groups.items():
+            ids = sorted(ids & generator_ids)
+            if ids:
+                for source in source_group.files():
+                    yield [LazyImageCacheFile(id, source=source) for id in ids]
+
     def source_group_receiver(self, sender, source, signal, **kwargs):
         """
         Relay source group signals to the appropriate spec strategy.
 
         """
         from .cachefiles import ImageCacheFile
+        from .specs import share_source
         source_group = sender
 
         # Ignore signals from unregistered groups.
@@ -110,6 +162,9 @@ class SourceGroupRegistry(object):
                 self._source_groups[source_group]]
         callback_name = self._signals[signal]
 
+        # Whichever specs get generated now can decode the source only once.
+        share_source(specs)
+
         for spec in specs:
             file = ImageCacheFile(spec)
             call_strategy_method(file, callback_name)
@@ -128,6 +183,8 @@ class CacheFileRegistry(object):
 
     def __init__(self):
         self._cachefiles = {}
+        # The same associations, indexed by generator id.
+        self._generator_cachefiles = {}
 
     def register(self, generator_id, cachefiles):
         """
@@ -137,6 +194,9 @@ class CacheFileRegistry(object):
         if cachefiles not in self._cachefiles:
             self._cachefiles[cachefiles] = set()
         self._cachefiles[cachefiles].add(generator_id)
+        registered = self._generator_cachefiles.setdefault(generator_id, [])
+        if cachefiles not in registered:
+            registered.append(cachefiles)
 
     def unregister(self, generator_id, cachefiles):
         """
@@ -147,12 +207,43 @@ class CacheFileRegistry(object):
             self._cachefiles[cachefiles].remove(generator_id)
         except KeyError:
             pass
+        registered = self._generator_cachefiles.get(generator_id, [])
+        if cachefiles in registered:
+            registered.remove(cachefiles)
+            if not registered:
+                del self._generator_cachefiles[generator_id]
+
+    def get_cachefiles(self, generator_id):
+        """
+        Returns the cachefiles iterables registered for the generator id.
+
+        """
+        return list(self._generator_cachefiles.get(generator_id, ()))
+
+    def get(self, generator_id, offset=0, limit=None):
+        """
+        Yields the files registered for the generator id, skipping the first
+        ``offset`` of them and stopping after ``limit`` (if given). The files
+        are produced lazily, so only as many as are needed get made.
+
+        """
+        files = (file for k in self.get_cachefiles(generator_id)
+                 for file in k())
+        stop = offset + limit if limit is not None else None
+        return islice(files, offset, stop)
+
+    def get_chunks(self, generator_id, size, offset=0, limit=None):
+        """
+        Like ``get()``, but yields the files in lists of (at most) ``size``.
+
+        """
+        files = self.get(generator_id, offset=offset, limit=limit)
+        while True:
+            chunk = list(islice(files, size))
+            if not chunk:
+                return
+            yield chunk
 
-    def get(self, generator_id):
-        for k, v in self._cachefiles.items():
-            if generator_id in v:
-                for file in k():
-                    yield file
 
 class Register(object):
     """
@@ -9,4 +9,10 @@ existence_required = imagekit_signals.signal('existence_required')
 # Source group signals
 source_saved = imagekit_signals.signal('source_saved')
 
-post_init = imagekit_signals.signal('post_init')
\ No newline at end of file
+post_init = imagekit_signals.signal('post_init')
+
+# Sent after a model instance is saved, with the instance's class as the sender
+# (``post_save.send(type(instance), instance=instance)``). Mongoengine
+# documents are handled automatically; for other model libraries, send it
+# from wherever instances get saved so that ``source_saved`` is dispatched.
+post_save = imagekit_signals.signal('post_save')
\ No newline at end of file
@@ -1,11 +1,41 @@
+import six
+import threading
 from copy import copy
 from ..exceptions import MissingSource, AlreadyRegistered
 from ..cachefiles.backends import get_default_cachefile_backend
 from ..cachefiles.strategies import load_strategy
-from ..utils import open_image, get_by_qname, process_image, conf
+from ..utils import open_image, get_by_qname, process_image, LRUCache, conf
 from .. import hashers
 from ..registry import generator_registry, register
 from ..model_helpers import get_image
+from ..processors import (Adjust, MakeOpaque, Transpose, Resize, ResizeToCover,
+                          ResizeToFill, SmartResize, ResizeToFit, Thumbnail)
+from ..processors.geometry import get_output_size
+
+_FINGERPRINT_ATTRS = ('processors', 'format', 'options', 'autoconvert')
+
+_name_cache = None
+
+
+def _get_name_cache():
+    global _name_cache
+    if _name_cache is None:
+        _name_cache = LRUCache(conf.IMAGEKIT_SPEC_NAME_CACHE_SIZE)
+    return _name_cache
+
+
+def _overrides(cls, *attrs):
+    # Whether a subclass of ImageSpec has its own version of any of the
+    # attributes, in which case the name may depend on more than the spec's
+    # options and can't be memoized.
+    for attr in attrs:
+        for klass in cls.__mro__:
+            if attr in vars(klass):
+                if klass is not ImageSpec:
+                    return True
+                break
+    return False
+
 
 class BaseImageSpec(object):
     """
@@ -24,7 +54,7 @@ class BaseImageSpec(object):
 
     """
 
-    cachefile_strategy = conf.IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY
+    cachefile_strategy = None
     """
     A dictionary containing callbacks that allow you to customize how and when
     the image file is created. Defaults to
@@ -34,7 +64,8 @@ class BaseImageSpec(object):
 
     def __init__(self):
         self.cachefile_backend = self.cachefile_backend or get_default_cachefile_backend()
-        self.cachefile_strategy = load_strategy(self.cachefile_strategy)
+        self.cachefile_strategy = load_strategy(
+            self.cachefile_strategy or conf.IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY)
 
     def generate(self):
         raise NotImplementedError
@@ -89,8 +120,25 @@ class ImageSpec(BaseImageSpec):
     def cachefile_name(self):
         if not self.source:
             return None
-        fn = get_by_qname(conf.IMAGEKIT_SPEC_CACHEFILE_NAMER, 'namer')
-        return fn(self)
+        namer = conf.IMAGEKIT_SPEC_CACHEFILE_NAMER
+        cls = type(self)
+        fingerprint = self.get_fingerprint()
+        if fingerprint is None or _overrides(cls, 'get_hash', '_get_hash'):
+            return get_by_qname(namer, 'namer')(self)
+
+        # Namers only look at the source's name and the spec's options, so the
+        # name can be reused by any instance of the spec class.
+        source = self.source
+        is_path = isinstance(source, six.string_types)
+        key = ('name', cls, namer, conf.IMAGEKIT_SPEC_HASHER,
+               conf.IMAGEKIT_CACHEFILE_DIR, fingerprint,
+               source if is_path else getattr(source, 'name', None), is_path)
+        names = _get_name_cache()
+        name = names.get(key)
+        if name is None:
+            name = get_by_qname(namer, 'namer')(self)
+            names.set(key, name)
+        return name
 
     @property
     def source(self):
@@ -108,19 +156,67 @@ class ImageSpec(BaseImageSpec):
 
     def __getstate__(self):
         state = copy(self.__dict__)
+        # A shared source image is only useful within this process.
+        state.pop('_shared_source', None)
         return state
 
+    def get_fingerprint(self):
+        """
+        Returns a digest of the spec's processors, format, options and
+        autoconvert. It's computed once for each spec class; ``None`` is
+        returned if the instance doesn't just use its class's values (e.g. if
+        one of them is a property).
+
+        """
+        cls = type(self)
+        values = []
+        for attr in _FINGERPRINT_ATTRS:
+            if attr in self.__dict__:
+                return None
+            value = getattr(cls, attr, None)
+            if hasattr(value, '__get__'):
+                return None
+            values.append(value)
+
+        # Remember the values that were hashed so that reassigning one of them
+        # on the class is noticed. (Changing a processor in place isn't.)
+        cached = cls.__dict__.get('_fingerprint')
+        if cached is not None and all(
+                a is b for a, b in zip(cached[0], values)):
+            return cached[1]
+        fingerprint = hashers.md5(values)
+        cls._fingerprint = (values, fingerprint)
+        return fingerprint
+
     def get_hash(self):
         # At this point the source might be data
         # or a unicode describing the path to data.
         # In either case, we just need an identifier
         # for the hash
-        if isinstance(self.source, basestring):
+        if isinstance(self.source, six.string_types):
             name = self.source
         else:
             name = self.source.name
 
-        return hashers.pickle([
+        cls = type(self)
+        fingerprint = self.get_fingerprint()
+        if fingerprint is None or _overrides(cls, '_get_hash'):
+            return self._get_hash(name)
+
+        # Pickling the processors is by far the slowest part of naming a cache
+        # file, so the hash is only computed once for each source of each spec
+        # class.
+        key = ('hash', cls, conf.IMAGEKIT_SPEC_HASHER, fingerprint, name)
+        hashes = _get_name_cache()
+        hash = hashes.get(key)
+        if hash is None:
+            hash = self._get_hash(name)
+            hashes.set(key, hash)
+        return hash
+
+    def _get_hash(self, name):
+        hasher = get_by_qname(conf.IMAGEKIT_SPEC_HASHER, 'hasher')
+        return hasher([
             name,
             self.processors,
             self.format,
@@ -135,13 +231,11 @@ class ImageSpec(BaseImageSpec):
 
         # TODO: Move into a generator base class
         # TODO: Factor out a generate_image function so you can create a generator and only override the PIL.Image creating part. (The tricky part is how to deal with original_format since generator base class won't have one.)
-        try:
-            img = open_image(get_image(self.source))
-        except ValueError:
-
-            # Re-open the file -- https://code.djangoproject.com/ticket/13750
-            self.source.open()
-            img = open_image(self.source)
+        shared = getattr(self, '_shared_source', None)
+        img = shared.get_image(self) if shared is not None else None
+        if img is None:
+            img = self.open_source_image()
+            draft_image(img, self.get_draft_size(img.size))
 
         if getattr(self, 'maintain_alpha', False) and img.mode == 'RGBA':
             alpha = img.split()[-1]
@@ -153,6 +247,168 @@ class ImageSpec(BaseImageSpec):
                              format=self.format, autoconvert=self.autoconvert,
                              options=self.options)
 
+    def open_source_image(self):
+        """
+        Opens the source as a ``PIL.Image``. The image is decoded lazily, when
+        its pixels are first needed.
+
+        """
+        try:
+            return open_image(get_image(self.source))
+        except ValueError:
+
+            # Re-open the file -- https://code.djangoproject.com/ticket/13750
+            self.source.open()
+            return open_image(self.source)
+
+    def get_output_dimensions(self, source_size=None):
+        """
+        Predicts the (width, height) of the image that ``generate()`` will
+        make, without making it. If the size of the source isn't given, it's
+        read from the source's header (the image isn't decoded). Returns
+        ``None`` if the processors' output can't be predicted.
+
+        """
+        if source_size is not None:
+            return get_output_size(self.processors, source_size)
+
+        file = get_image(self.source)
+        try:
+            img = open_image(file)
+            # Mirror what ``generate()`` will be working with.
+            draft_image(img, self.get_draft_size(img.size))
+            try:
+                orientation = img._getexif()[0x0112]
+            except (AttributeError, IndexError, KeyError, TypeError):
+                orientation = 1
+            return get_output_size(self.processors, img.size, orientation)
+        finally:
+            if file is not self.source:
+                file.close()
+
+    def get_draft_size(self, source_size):
+        """
+        Returns the smallest size the source can be decoded at without
+        affecting the result, based on the size that the leading resize
+        processor needs, or ``None`` if that can't be determined.
+
+        """
+        swap = False
+        for processor in self.processors or []:
+            if isinstance(processor, Transpose):
+                # The image may be rotated before it's resized.
+                swap = True
+            elif isinstance(processor, (Adjust, MakeOpaque)):
+                # These don't change the geometry of the image.
+                continue
+            elif isinstance(processor, (Resize, ResizeToCover, ResizeToFill,
+                                        SmartResize, ResizeToFit, Thumbnail)):
+                # Where only one dimension is given, the other one follows
+                # from the aspect ratio.
+                width, height = processor.width or 1, processor.height or 1
+                if swap:
+                    width = height = max(width, height)
+                if width >= source_size[0] and height >= source_size[1]:
+                    return None
+                return width, height
+            else:
+                return None
+        return None
+
+
+class SharedSourceImage(object):
+    """
+    A source image that is decoded once for several specs with the same
+    source. Each spec gets the decoded image to run its processors on; it's
+    only copied for specs whose processors might change it in place, and the
+    last spec to ask for it gets the original.
+
+    """
+    def __init__(self, specs):
+        self._specs = list(specs)
+        self._pending = set(id(spec) for spec in specs)
+        self._image = None
+        self._lock = threading.Lock()
+
+    def get_image(self, spec):
+        """
+        Returns the image for the spec, or ``None`` if the spec isn't one of
+        those the image is shared with (or it already got its image), in which
+        case the spec should open its source itself.
+
+        """
+        with self._lock:
+            if id(spec) not in self._pending:
+                return None
+            self._pending.discard(id(spec))
+
+            if self._image is None:
+                image = spec.open_source_image()
+                draft_image(image, self._get_draft_size(image.size))
+                image.load()
+                self._image, self._specs = image, None
+            image = self._image
+
+            if not self._pending:
+                # Nobody else needs it; don't hold on to the pixels.
+                self._image = None
+            elif _mutates_image(spec.processors):
+                format = image.format
+                image = image.copy()
+                # process_image() falls back to the source format.
+                image.format = format
+        return image
+
+
+    def _get_draft_size(self, source_size):
+        # The image has to be big enough for all of the specs.
+        sizes = [spec.get_draft_size(source_size) for spec in self._specs]
+        if not sizes or None in sizes:
+            return None
+        return max(w for w, h in sizes), max(h for w, h in sizes)
+
+
+def draft_image(img, size):
+    """
+    Asks the decoder of a JPEG image (which must not have been loaded yet) to
+    scale it down by 1/2, 1/4 or 1/8 while decoding, as long as the result is
+    still at least as big as ``size``.
+
+    """
+    if size and img.format == 'JPEG':
+        img.draft(img.mode, size)
+
+
+def _mutates_image(processors):
+    """
+    Tells whether any of the processors might change the image it's given in
+    place. pilkit's processors always return a new image; we can't know that
+    about anybody else's.
+
+    """
+    for processor in processors or []:
+        if isinstance(processor, list):
+            if _mutates_image(processor):
+                return True
+        elif not type(processor).__module__.startswith('pilkit.'):
+            return True
+    return False
+
+
+def share_source(specs):
+    """
+    Makes specs that have the same source decode it only once between them
+    when they are generated, instead of once each.
+
+    """
+    specs = [spec for spec in specs
+             if isinstance(spec, ImageSpec) and spec.source]
+    if len(specs) > 1:
+        shared = SharedSourceImage(specs)
+        for spec in specs:
+            spec._shared_source = shared
+    return specs
+
 
 def create_spec_class(class_attrs):
 
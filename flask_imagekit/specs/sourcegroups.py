@@ -1,7 +1,8 @@
 import inspect
+import six
 from functools import wraps
 from ..cachefiles import LazyImageCacheFile
-from ..signals import post_init
+from ..signals import post_init, post_save, source_saved
 from ..utils import get_nonabstract_descendants
 from ..model_helpers import get_local_fields
 
@@ -25,6 +26,22 @@ def ik_model_receiver(fn):
     return receiver
 
 
+def get_source_hash(source):
+    """
+    Returns a hash that changes when the source does. It's of a key for the
+    source (its path, GridFS id or name) rather than the source itself, which
+    may not be hashable (e.g. mongoengine's ``GridFSProxy`` on Python 3).
+
+    """
+    if source is None or isinstance(source, six.string_types):
+        key = source
+    else:
+        key = getattr(source, 'grid_id', None) or getattr(source, 'name', None)
+        if key is None:
+            key = id(source)
+    return hash(key)
+
+
 class ModelSignalRouter(object):
     """
     Normally, ``ImageFieldSourceGroup`` would be directly responsible for
@@ -41,12 +58,21 @@ class ModelSignalRouter(object):
 
     def __init__(self):
         self._source_groups = []
-        uid = 'ik_spec_field_receivers'
         post_init.connect(self.post_init_receiver)
-        # post_save.connect(self.post_save_receiver, dispatch_uid=uid)
+        post_save.connect(self.post_save_receiver)
+
+        # Mongoengine documents tell us when they're saved themselves.
+        try:
+            from mongoengine import signals as mongoengine_signals
+        except ImportError:
+            pass
+        else:
+            mongoengine_signals.post_save.connect(
+                self.mongoengine_post_save_receiver)
 
     def add(self, source_group):
-        self._source_groups.append(source_group)
+        if source_group not in self._source_groups:
+            self._source_groups.append(source_group)
 
     def init_instance(self, instance):
         instance._ik = getattr(instance, '_ik', {})
@@ -60,7 +86,7 @@ class ModelSignalRouter(object):
         """
         self.init_instance(instance)
         instance._ik['source_hashes'] = dict(
-            (attname, hash(getattr(instance, attname)))
+            (attname, get_source_hash(getattr(instance, attname)))
             for attname in self.get_source_fields(instance))
         return instance._ik['source_hashes']
 
@@ -73,18 +99,19 @@ class ModelSignalRouter(object):
                    for src in self._source_groups
                    if isinstance(instance, src.model_class))
 
-    # TODO Implement a post_save signal
-    # @ik_model_receiver
-    # def post_save_receiver(self, sender, instance=None, created=False, raw=False, **kwargs):
-    #     if not raw:
-    #         self.init_instance(instance)
-    #         old_hashes = instance._ik.get('source_hashes', {}).copy()
-    #         new_hashes = self.update_source_hashes(instance)
-    #         for attname in self.get_source_fields(instance):
-    #             file = getattr(instance, attname)
-    #             if file and old_hashes.get(attname) != new_hashes[attname]:
-    #                 self.dispatch_signal(source_saved, file, sender, instance,
-    #                                      attname)
+    @ik_model_receiver
+    def post_save_receiver(self, sender, instance=None, **kwargs):
+        self.init_instance(instance)
+        old_hashes = instance._ik.get('source_hashes', {}).copy()
+        new_hashes = self.update_source_hashes(instance)
+        for attname in self.get_source_fields(instance):
+            file = getattr(instance, attname)
+            if file and old_hashes.get(attname) != new_hashes[attname]:
+                self.dispatch_signal(source_saved, file, sender, instance,
+                                     attname)
+
+    def mongoengine_post_save_receiver(self, sender, document=None, **kwargs):
+        self.post_save_receiver(sender, instance=document)
 
     @ik_model_receiver
     def post_init_receiver(self, sender, instance=None, **kwargs):
@@ -92,10 +119,12 @@ class ModelSignalRouter(object):
         source_fields = self.get_source_fields(instance)
 
         # TODO - Factor this out to work with other model libraries besides Mongoengine
-        local_fields = get_local_fields(instance, source_fields)
+        # The hashes are of the instance's values (not of the field
+        # definitions), so that saving a new source can be noticed.
+        local_fields = get_local_fields(instance, source_fields) or {}
         instance._ik['source_hashes'] = dict(
-            (attname, hash(file_field))
-            for attname, file_field in local_fields.items())
+            (attname, get_source_hash(getattr(instance, attname)))
+            for attname in local_fields)
 
     def dispatch_signal(self, signal, file, model_class, instance, attname):
         """
@@ -106,7 +135,9 @@ class ModelSignalRouter(object):
         """
         for source_group in self._source_groups:
             if issubclass(model_class, source_group.model_class) and source_group.image_field == attname:
-                signal.send(source_group, source=file)
+                # Unlike Django's, blinker's receivers aren't told which
+                # signal they're receiving.
+                signal.send(source_group, source=file, signal=signal)
 
 
 class ImageFieldSourceGroup(object):
@@ -120,6 +151,20 @@ class ImageFieldSourceGroup(object):
         self.image_field = image_field
         signal_router.add(self)
 
+    # Every spec field creates its own source group, but all of the specs of
+    # an image field should be handled together (so that its image only has
+    # to be decoded once for all of them).
+    def __eq__(self, other):
+        return (isinstance(other, self.__class__)
+            and self.model_class == other.model_class
+            and self.image_field == other.image_field)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.model_class, self.image_field))
+
     def files(self):
         """
         A generator that returns the source files that this source group
@@ -128,7 +173,12 @@ class ImageFieldSourceGroup(object):
 
         """
         for model in get_nonabstract_descendants(self.model_class):
-            for instance in model.objects.all().iterator():
+            queryset = model.objects.all()
+            # Django querysets need iterator() to avoid caching every
+            # instance; other libraries' querysets can be iterated directly.
+            if hasattr(queryset, 'iterator'):
+                queryset = queryset.iterator()
+            for instance in queryset:
                 yield getattr(instance, self.image_field)
 
 
@@ -17,7 +17,9 @@ class GenerateImage():
                 self._generator_kwargs)
 
     def __str__(self):
-        attrs = self._html_attrs
+        # Copy the attributes so that the tag's own (and the shared default)
+        # aren't changed.
+        attrs = dict(self._html_attrs)
 
         # Only add width and height if neither is specified (to allow for
         # proportional in-browser scaling).
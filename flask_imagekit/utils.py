@@ -1,13 +1,16 @@
 import re
 import random, string
+import six
+import threading
+
+from collections import OrderedDict
 
-# TODO - Does SimpleCache suffice?
 from werkzeug.contrib.cache import SimpleCache
 from hashlib import md5
 from .exceptions import ImproperlyConfigured
 from importlib import import_module
-from tempfile import NamedTemporaryFile
 from .django_ported.files import File
+from .files import IKContentFile
 from pilkit.utils import *
 
 bad_memcached_key_chars = re.compile('[\u0000-\u001f\\s]+')
@@ -24,7 +27,11 @@ def set_flask_app(app):
 
 def get_nonabstract_descendants(model):
     """ Returns all non-abstract descendants of the model. """
-    if not model._meta.abstract:
+    meta = getattr(model, '_meta', None) or {}
+    # Mongoengine keeps its options in a dict, Django in an object.
+    abstract = (meta.get('abstract', False) if isinstance(meta, dict)
+                else getattr(meta, 'abstract', False))
+    if not abstract:
         yield model
     for s in model.__subclasses__():
         for m in get_nonabstract_descendants(s):
@@ -81,22 +88,50 @@ def autodiscover():
 def generate(generator):
     """
     Calls the ``generate()`` method of a generator instance, and then wraps the
-    result in a Django File object so Django knows how to save it.
+    result in a File object so that a storage knows how to save it.
 
     """
     content = generator.generate()
 
-    # If the file doesn't have a name, Django will raise an Exception while
-    # trying to save it, so we create a named temporary file.
-    if not getattr(content, 'name', None):
-        f = NamedTemporaryFile()
-        f.write(content.read())
-        f.seek(0)
-        content = f
+    # In-memory content is saved straight from its buffer.
+    if hasattr(content, 'getvalue'):
+        return IKContentFile(content)
 
     return File(content)
 
 
+def run_in_executor(fn, *args, **kwargs):
+    """
+    Calls the function in the asyncio event loop's executor and returns a
+    future for its result, so that blocking work (storage requests, image
+    processing) doesn't hold up the loop.
+
+    """
+    from functools import partial
+    return _get_event_loop().run_in_executor(None,
+                                             partial(fn, *args, **kwargs))
+
+
+def resolved(value):
+    """
+    Returns a future that already has the value as its result, for async
+    methods that have nothing to wait for.
+
+    """
+    future = _get_event_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+def _get_event_loop():
+    try:
+        import asyncio
+    except ImportError:
+        raise ImproperlyConfigured('The async API requires Python 3.5 or'
+                                   ' later.')
+    return asyncio.get_event_loop()
+
+
 def call_strategy_method(file, method_name):
     strategy = getattr(file, 'cachefile_strategy', None)
     fn = getattr(strategy, method_name, None)
@@ -112,11 +147,77 @@ def sanitize_cache_key(key):
         # The also can't be > 250 chars long. Since we don't know what the
         # user's cache ``KEY_FUNCTION`` setting is like, we'll limit it to 200.
         if len(new_key) >= 200:
-            new_key = '%s:%s' % (new_key[:200-33], md5(key).hexdigest())
+            digest = md5(key.encode('utf-8') if isinstance(key, six.text_type)
+                         else key).hexdigest()
+            new_key = '%s:%s' % (new_key[:200-33], digest)
 
         key = new_key
     return key
 
 
-get_cache = SimpleCache()
+class LRUCache(object):
+    """
+    A thread-safe mapping that only holds on to its ``maxsize`` most recently
+    used items.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_cache = None
+
+
+def get_cache():
+    """
+    Returns the cache used to store the state of cache files, as configured by
+    ``IMAGEKIT_CACHE_BACKEND``. This can be a werkzeug cache instance or the
+    dotted path to a cache class, which will be instantiated with
+    ``IMAGEKIT_CACHE_OPTIONS``. For example, to share state between all of the
+    processes on a machine without an outside service::
+
+        IMAGEKIT_CACHE_BACKEND = 'werkzeug.contrib.cache.FileSystemCache'
+        IMAGEKIT_CACHE_OPTIONS = {'cache_dir': '/var/cache/imagekit',
+                                  'threshold': 0}
+
+    Defaults to a process-local ``SimpleCache``.
+
+    """
+    global _cache
+    if _cache is None:
+        backend = conf.IMAGEKIT_CACHE_BACKEND
+        if backend is None:
+            _cache = SimpleCache()
+        elif isinstance(backend, six.string_types):
+            cls = get_by_qname(backend, 'cache backend')
+            _cache = cls(**(conf.IMAGEKIT_CACHE_OPTIONS or {}))
+        else:
+            _cache = backend
+    return _cache
 